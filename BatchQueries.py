@@ -0,0 +1,168 @@
+import csv
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from DiceStrings import canonical_dice_string
+from ExactExplodingDice import exact_success_odds
+from ExplodingDiceSimulator import (
+    calculate_dice_average,
+    calculate_success_odds,
+    calculate_survival_table,
+    default_survival_table_method,
+    dice_average,
+    table_success_odds,
+)
+
+BATCH_OUTPUT_FIELDS = ["line", "dice", "target", "odds", "average", "error"]
+
+
+def read_batch_queries(path):
+    """
+    Read queries from a CSV file (with "dice" and optional "target" columns) or a JSON lines file.
+    Lines that cannot be read are passed on with an error, so that one bad line does not stop the batch.
+    :param path: The file to read ("-" for JSON lines on standard input).
+    :return: A generator of (line number, dice string, target or None, error or None) tuples.
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, newline="") as file:
+            # Line 1 is the header, so the first query is on line 2
+            for line, row in enumerate(csv.DictReader(file), start=2):
+                yield _read_query(line, lambda: row)
+        return
+    file = sys.stdin if path == "-" else open(path)
+    try:
+        for line, text in enumerate(file, start=1):
+            if text.strip():
+                yield _read_query(line, lambda: json.loads(text))
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+
+def _read_query(line, load):
+    # Read one query from what `load` returns, turning anything wrong with it into an error for its line
+    try:
+        query = load()
+        target = query.get("target")
+        # Targets are whole numbers, whether they come from CSV text or JSON strings or numbers
+        target = int(target) if target not in (None, "") else None
+        return line, str(query["dice"]), target, None
+    except (ValueError, KeyError, TypeError, AttributeError) as error:
+        return line, None, None, f"Bad query: {error!r}"
+
+
+def evaluate_pool(dice_string, targets, average, method, seed):
+    """
+    Answer every query against one pool, computing the pool's odds table (and average) only once.
+    :param dice_string: The dice string of the pool.
+    :param targets: The target numbers asked about.
+    :param average: Whether the pool's average was asked about.
+    :param method: "exact" or "simulated" (see calculate_survival_table).
+    :param seed: The seed for simulations.
+    :return: ({target: odds}, average or None)
+    """
+    odds = {}
+    if targets:
+        survival_table = calculate_survival_table(dice_string, method, seed=seed)
+        for target in targets:
+            odds[target] = table_success_odds(survival_table, target)
+            # Targets beyond the end of the table are rare enough to be calculated separately,
+            # exactly with integers when the table is exact and by simulation otherwise
+            if odds[target] is None:
+                if method == "exact":
+                    odds[target] = float(exact_success_odds(dice_string, target))
+                else:
+                    odds[target] = calculate_success_odds(
+                        dice_string, target, seed=seed
+                    )[0]
+    pool_average = None
+    if average:
+        if method == "exact":
+            pool_average = dice_average(dice_string)
+        else:
+            pool_average = calculate_dice_average(dice_string, seed=seed)[0]
+    return odds, pool_average
+
+
+def run_batch(input_path, output_path=None, workers=1, method=None, seed=None):
+    """
+    Evaluate a file of queries, grouping them by pool so each distinct pool is computed only once.
+    Pools are spread across a process pool, and each pool's results are written as soon as it is done.
+    :param input_path: CSV or JSON lines file of queries (see read_batch_queries).
+    :param output_path: CSV or JSON lines file to write results to (JSON lines on standard output if None).
+    :param workers: The number of processes to spread pools across.
+    :param method: "exact" or "simulated" (see calculate_survival_table).
+    :param seed: The seed for simulations.
+    """
+    if method is None:
+        method = default_survival_table_method()
+    output = open(output_path, "w", newline="") if output_path else sys.stdout
+    writer = None
+    if output_path and output_path.lower().endswith(".csv"):
+        writer = csv.DictWriter(output, BATCH_OUTPUT_FIELDS)
+        writer.writeheader()
+
+    def write_result(line, dice_string, target, odds=None, average=None, error=None):
+        result = {
+            "line": line,
+            "dice": dice_string,
+            "target": target,
+            "odds": odds,
+            "average": average,
+            "error": error,
+        }
+        if writer is not None:
+            writer.writerow(result)
+        else:
+            output.write(json.dumps(result) + "\n")
+
+    try:
+        # Group queries by the canonical form of their pool, reporting the ones that cannot be read
+        pools = {}
+        for line, dice_string, target, error in read_batch_queries(input_path):
+            if error is None:
+                try:
+                    pool = pools.setdefault(canonical_dice_string(dice_string), [])
+                except ValueError as bad_dice:
+                    error = f"Bad dice string: {bad_dice}"
+                else:
+                    pool.append((line, dice_string, target))
+                    continue
+            write_result(line, dice_string, target, error=error)
+        output.flush()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(
+                    evaluate_pool,
+                    pool_dice_string,
+                    sorted({target for _, _, target in queries if target is not None}),
+                    any(target is None for _, _, target in queries),
+                    method,
+                    seed,
+                ): queries
+                for pool_dice_string, queries in pools.items()
+            }
+            for future in as_completed(futures):
+                try:
+                    odds, average = future.result()
+                except Exception as error:
+                    # A pool that fails is reported on each of its lines, and the other pools carry on
+                    for line, dice_string, target in futures[future]:
+                        write_result(
+                            line,
+                            dice_string,
+                            target,
+                            error=f"Calculation failed: {type(error).__name__}: {error}",
+                        )
+                    output.flush()
+                    continue
+                for line, dice_string, target in futures[future]:
+                    if target is not None:
+                        write_result(line, dice_string, target, odds=odds[target])
+                    else:
+                        write_result(line, dice_string, target, average=average)
+                output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
@@ -0,0 +1,182 @@
+import argparse
+import datetime
+import json
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+
+from AverageExplodingDice import average_exploding_dice
+from DistributionOfExplodingDice import probability_at_least, sum_distribution
+from ExactExplodingDice import certify, exact_dice_average, exact_success_odds
+from ExplodingDiceSimulator import (
+    calculate_dice_average,
+    calculate_success_odds,
+    count_successes,
+    chunk_rng,
+)
+from ProbabilitySumOfExplodingDice import probability_sum_of_exploding_dice
+
+BENCHMARK_SEED = 20240101
+BENCHMARK_SIMULATION_STEPS = 1000000
+
+# Pools of exploding dice (by number of sides) and the targets they are benchmarked against
+BENCHMARK_CORPUS = [
+    {"name": "small", "dice": [4, 8], "targets": [4, 8, 12]},
+    {"name": "small-pool", "dice": [4, 6, 6], "targets": [10, 20, 30]},
+    {"name": "wide", "dice": [6] * 8 + [8] * 2, "targets": [30, 40, 50]},
+    {"name": "deep-tail", "dice": [4], "targets": [20, 40, 60]},
+    {"name": "deep-tail-pool", "dice": [6, 6, 8], "targets": [50, 80]},
+]
+
+
+def dice_string_of(dice):
+    """Write a list of exploding dice sizes as a dice string (e.g. [4, 8] -> "1d4e+1d8e")"""
+    return "+".join(f"1d{sides}e" for sides in dice)
+
+
+def measure(function):
+    """
+    Run a function twice: once for its wall time, then again under tracemalloc for its peak memory.
+    :return: (result, seconds, peak bytes)
+    """
+    start = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def odds_engines(dice):
+    """The engines that answer P(sum of the dice >= target), as {name: (function of target, trials or None)}"""
+    dice_string = dice_string_of(dice)
+    return {
+        "simulation": (
+            lambda target: count_successes(
+                dice_string,
+                target,
+                BENCHMARK_SIMULATION_STEPS,
+                chunk_rng(BENCHMARK_SEED, 0),
+            )
+            / BENCHMARK_SIMULATION_STEPS,
+            BENCHMARK_SIMULATION_STEPS,
+        ),
+        "adaptive_simulation": (
+            lambda target: calculate_success_odds(
+                dice_string, target, seed=BENCHMARK_SEED
+            )[0],
+            None,
+        ),
+        "convolution": (
+            lambda target: probability_at_least(sum_distribution(dice_string), target),
+            None,
+        ),
+        "exact": (
+            lambda target: float(exact_success_odds(dice_string, target)),
+            None,
+        ),
+        "recursive": (
+            lambda target: probability_sum_of_exploding_dice(dice, target),
+            None,
+        ),
+    }
+
+
+def average_engines(dice):
+    """The engines that answer the average of the sum of the dice, as {name: (function, trials or None)}"""
+    dice_string = dice_string_of(dice)
+    return {
+        "closed_form": (lambda: average_exploding_dice(dice), None),
+        "simulation": (
+            lambda: calculate_dice_average(dice_string, seed=BENCHMARK_SEED)[0],
+            None,
+        ),
+    }
+
+
+def run_benchmarks(corpus=BENCHMARK_CORPUS):
+    """
+    Run every engine against every pool and target in the corpus, certifying each result against the exact answer.
+    :return: A list of result records (one per engine, pool and target).
+    """
+    records = []
+    for case in corpus:
+        dice = case["dice"]
+        for target in case["targets"]:
+            exact = exact_success_odds(dice_string_of(dice), target)
+            for engine, (function, trials) in odds_engines(dice).items():
+                result, seconds, peak = measure(lambda: function(target))
+                records.append(
+                    {
+                        "case": case["name"],
+                        "dice": dice_string_of(dice),
+                        "query": "odds",
+                        "target": target,
+                        "engine": engine,
+                        "result": result,
+                        **certify(result, exact),
+                        "seconds": seconds,
+                        "trials_per_second": (
+                            trials / seconds if trials is not None else None
+                        ),
+                        "peak_memory_bytes": peak,
+                    }
+                )
+        exact = exact_dice_average(dice_string_of(dice))
+        for engine, (function, trials) in average_engines(dice).items():
+            result, seconds, peak = measure(function)
+            records.append(
+                {
+                    "case": case["name"],
+                    "dice": dice_string_of(dice),
+                    "query": "average",
+                    "target": None,
+                    "engine": engine,
+                    "result": result,
+                    **certify(result, exact),
+                    "seconds": seconds,
+                    "trials_per_second": None,
+                    "peak_memory_bytes": peak,
+                }
+            )
+    return records
+
+
+# Run the benchmarks when this file is executed as the main module
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the simulation, recursive and exact engines against each other."
+    )
+    parser.add_argument(
+        "--output",
+        default="benchmark_results.json",
+        help="JSON file to save the results to",
+    )
+    options = parser.parse_args()
+
+    records = run_benchmarks()
+    print(
+        f"{'case':<16}{'query':<9}{'target':>7}  {'engine':<21}{'seconds':>10}{'peak KiB':>10}{'abs error':>12}"
+    )
+    for record in records:
+        target = "" if record["target"] is None else record["target"]
+        print(
+            f"{record['case']:<16}{record['query']:<9}{target:>7}  {record['engine']:<21}"
+            f"{record['seconds']:>10.4f}{record['peak_memory_bytes'] / 1024:>10.1f}{record['absolute_error']:>12.2e}"
+        )
+    with open(options.output, "w") as file:
+        json.dump(
+            {
+                "timestamp": datetime.datetime.now().isoformat(),
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "results": records,
+            },
+            file,
+            indent=4,
+        )
+    print(f"\nSaved benchmark results to {options.output}")
@@ -0,0 +1,240 @@
+import argparse
+import asyncio
+import json
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from fractions import Fraction
+from urllib.parse import parse_qs, urlsplit
+
+from DiceStrings import canonical_dice_string, compile_dice_string
+from ExactExplodingDice import exact_counts_below
+from ExplodingDiceSimulator import (
+    calculate_success_odds,
+    calculate_success_odds_importance_sampled,
+    calculate_survival_table,
+    dice_average,
+    success_odds_upper_bound,
+    table_success_odds,
+)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+HTTP_STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    500: "Internal Server Error",
+}
+# Counting the ways below a limit takes time growing with its square, so tail targets past this one are
+# importance sampled instead (or answered with 0 once their odds are too small for a float)
+EXACT_TAIL_MAXIMUM_LIMIT = 1024
+
+
+class DiceServer:
+    """
+    A local HTTP server answering average, odds and distribution queries.
+    Compiled dice strings, averages, odds tables, exact counts and simulated odds stay in memory between requests,
+    and anything CPU-heavy runs on a process pool so the event loop is never blocked.
+    """
+
+    def __init__(self, workers=None):
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        # Keyed on canonical dice strings (and targets for odds)
+        self.survival_tables = {}
+        self.averages = {}
+        self.odds = {}
+        # Keyed on canonical dice strings and limits, see exact_tail_odds
+        self.exact_counts = {}
+        # Calculations still running, so that concurrent requests for the same result share them
+        self.pending = {}
+
+    async def compute(self, key, cache, function, *arguments):
+        """Return cache[key], calculating it on the process pool (only once, however many requests wait on it)."""
+        if key in cache:
+            return cache[key]
+        if key not in self.pending:
+            loop = asyncio.get_running_loop()
+            self.pending[key] = loop.run_in_executor(
+                self.executor, function, *arguments
+            )
+        try:
+            result = await self.pending[key]
+        finally:
+            self.pending.pop(key, None)
+        cache[key] = result
+        return result
+
+    async def survival_table(self, dice_string):
+        dice_string = canonical_dice_string(dice_string)
+        return await self.compute(
+            ("table", dice_string),
+            self.survival_tables,
+            calculate_survival_table,
+            dice_string,
+        )
+
+    async def exact_tail_odds(self, dice_string, target):
+        """
+        Calculate the exact odds of a dice string reaching a target number from its counts of ways below a limit.
+        The limit is rounded up to a power of two, so the counts of one pool answer every target below it.
+        :return: (odds, confidence interval or None)
+        """
+        dice_string = canonical_dice_string(dice_string)
+        # Get the effective target number by subtracting the modifier
+        effective_target = target - compile_dice_string(dice_string).modifier
+        limit = 1 << effective_target.bit_length()
+        if limit > EXACT_TAIL_MAXIMUM_LIMIT:
+            if success_odds_upper_bound(dice_string, target) == 0:
+                return 0.0, None
+            return await self.compute(
+                ("odds", dice_string, target),
+                self.odds,
+                calculate_success_odds_importance_sampled,
+                dice_string,
+                target,
+            )
+        ways, denominator = await self.compute(
+            ("exact", dice_string, limit),
+            self.exact_counts,
+            exact_counts_below,
+            dice_string,
+            limit,
+        )
+        odds = Fraction(denominator - sum(ways[:effective_target]), denominator)
+        return float(odds), None
+
+    async def handle_average(self, query):
+        dice_string = query["dice"]
+        # Pools keeping only some of their dice are averaged exactly, which is worth doing off the event loop
+        canonical = canonical_dice_string(dice_string)
+        average = await self.compute(
+            ("average", canonical), self.averages, dice_average, canonical
+        )
+        return {"dice": dice_string, "average": average}
+
+    async def handle_odds(self, query):
+        dice_string = query["dice"]
+        target = int(query["target"])
+        survival_table = await self.survival_table(dice_string)
+        odds = table_success_odds(survival_table, target)
+        interval = None
+        # Targets beyond the end of an exact odds table are answered exactly, those of a simulated one are simulated
+        if odds is None and survival_table["method"] == "exact":
+            odds, interval = await self.exact_tail_odds(dice_string, target)
+        elif odds is None:
+            odds, interval = await self.compute(
+                ("odds", canonical_dice_string(dice_string), target),
+                self.odds,
+                calculate_success_odds,
+                dice_string,
+                target,
+            )
+        return {
+            "dice": dice_string,
+            "target": target,
+            "odds": odds,
+            "confidence_interval": interval,
+        }
+
+    async def handle_distribution(self, query):
+        dice_string = query["dice"]
+        survival_table = await self.survival_table(dice_string)
+        return {
+            "dice": dice_string,
+            "method": survival_table["method"],
+            "minimum": survival_table["minimum"],
+            "survival": survival_table["survival"],
+        }
+
+    async def respond(self, path):
+        """Answer one request path, returning (status, JSON body)."""
+        url = urlsplit(path)
+        handlers = {
+            "/average": self.handle_average,
+            "/odds": self.handle_odds,
+            "/distribution": self.handle_distribution,
+        }
+        if url.path not in handlers:
+            return 404, {"error": f"Unknown endpoint: {url.path}"}
+        # A "+" is kept literal (rather than read as a space) as dice strings use it for addition
+        query = parse_qs(url.query.replace("+", "%2B"))
+        query = {name: values[0] for name, values in query.items()}
+        try:
+            return 200, await handlers[url.path](query)
+        except (KeyError, ValueError) as error:
+            return 400, {"error": f"Bad query: {error}"}
+        except Exception as error:
+            # Any other failure still gets a response, rather than leaving the client waiting
+            traceback.print_exc()
+            return 500, {
+                "error": f"Calculation failed: {type(error).__name__}: {error}"
+            }
+
+    async def handle_connection(self, reader, writer):
+        """Serve requests on one connection until the client closes it (connections are kept alive)."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                keep_alive = True
+                # Skip the headers, only noting whether the client wants the connection closed
+                while True:
+                    header = await reader.readline()
+                    if header in (b"\r\n", b"\n", b""):
+                        break
+                    if (
+                        header.lower().startswith(b"connection:")
+                        and b"close" in header.lower()
+                    ):
+                        keep_alive = False
+                try:
+                    _, path, _ = request_line.decode("latin-1").split(" ")
+                    status, body = await self.respond(path)
+                except ValueError:
+                    status, body = 400, {"error": "Malformed request line"}
+                content = json.dumps(body).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {HTTP_STATUS_TEXT[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(content)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode()
+                    + content
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None):
+        """Serve forever over TCP, or over a Unix socket if a path is given."""
+        if unix_path is not None:
+            server = await asyncio.start_unix_server(self.handle_connection, unix_path)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+# Run the server when this file is executed as the main module
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Serve exploding dice averages, odds and distributions over local HTTP."
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", help="serve on this Unix socket path instead of TCP")
+    parser.add_argument(
+        "--workers", type=int, help="number of processes for calculations"
+    )
+    options = parser.parse_args()
+    print(
+        f"Serving on {options.unix or f'http://{options.host}:{options.port}'} "
+        "(endpoints: /average?dice=, /odds?dice=&target=, /distribution?dice=)"
+    )
+    asyncio.run(
+        DiceServer(options.workers).serve(options.host, options.port, options.unix)
+    )
@@ -0,0 +1,263 @@
+import random
+from array import array
+from functools import lru_cache
+
+COMPILED_EXPRESSION_CACHE_SIZE = 1024
+# A wild die (as in Savage Worlds) is an exploding d6 rolled alongside a die group, which keeps its highest dice
+WILD_DIE_SIDES = 6
+
+# Dice strings are parsed and compiled here, apart from the engines that roll or calculate them,
+# so that every engine can build on them without importing the others
+
+
+def parse_dice_string(dice_string):
+    """Parse a dice string into an object {
+        dice: [{ count: int, sides: int, exploding: bool, keep: int or None, keep_lowest: bool, wild: bool }],
+        modifier: int
+    }
+    keep is the number of dice kept (None to keep them all), the lowest ones if keep_lowest is True
+    """
+    dice = []
+    modifier = 0
+    # Replace subtraction with addition of negative numbers to simplify parsing
+    dice_string = dice_string.replace("-", "+-")
+    # Split by the + to separate types of dice and modifiers (note that you cannot subtract dice)
+    tokens = dice_string.split("+")
+    for token in tokens:
+        # Check if the token is a die or a modifier
+        if "d" in token:
+            # Split by the d to separate the count and sides of the die
+            count, sides = token.split("d")
+            # Check if the die group is rolled with a wild die or keeps only some of its dice
+            keep = None
+            keep_lowest = False
+            wild = False
+            if sides.endswith("w"):
+                sides = sides[:-1]
+                wild = True
+            elif "k" in sides:
+                sides, keep = sides.split("k")
+                if keep[:1] not in ("h", "l"):
+                    raise ValueError(f"Expected kh or kl in '{token}'")
+                keep_lowest = keep[0] == "l"
+                keep = int(keep[1:])
+            # Check if the die is exploding
+            exploding = False
+            if "e" in sides:
+                sides = sides[:-1]
+                exploding = True
+            dice.append(
+                {
+                    "count": int(count),
+                    "sides": int(sides),
+                    "exploding": exploding,
+                    "keep": keep,
+                    "keep_lowest": keep_lowest,
+                    "wild": wild,
+                }
+            )
+        else:
+            modifier += int(token)
+    return {"dice": dice, "modifier": modifier}
+
+
+class DiceExpression:
+    """A dice string parsed once into per-die arrays, with its limits and average precomputed
+    (the average is None when a group keeps only some of its dice)
+    Each die group i is counts[i] dice with sides[i] sides, exploding if exploding[i] is 1,
+    plus a wild die if wild[i] is 1. If keep[i] is not 0, only the keep[i] highest dice of the group
+    (or lowest, if keep_lowest[i] is 1) are added to the total
+    """
+
+    __slots__ = (
+        "dice_string",
+        "counts",
+        "sides",
+        "exploding",
+        "keep",
+        "keep_lowest",
+        "wild",
+        "modifier",
+        "labels",
+        "minimum",
+        "maximum",
+        "mean",
+    )
+
+    def __init__(self, dice_string):
+        parsed_dice = parse_dice_string(dice_string)
+        self.dice_string = dice_string
+        self.counts = array("i", (die["count"] for die in parsed_dice["dice"]))
+        self.sides = array("i", (die["sides"] for die in parsed_dice["dice"]))
+        self.exploding = array("b", (die["exploding"] for die in parsed_dice["dice"]))
+        self.keep = array("i")
+        for die in parsed_dice["dice"]:
+            if die["wild"]:
+                # The wild die can only replace one of the group's dice
+                self.keep.append(die["count"])
+            elif die["keep"] is None or die["keep"] >= die["count"]:
+                # Keeping every die is the same as a plain sum
+                self.keep.append(0)
+            elif die["keep"] < 1:
+                raise ValueError(f"Cannot keep {die['keep']} dice")
+            else:
+                self.keep.append(die["keep"])
+        self.keep_lowest = array(
+            "b", (die["keep_lowest"] for die in parsed_dice["dice"])
+        )
+        self.wild = array("b", (die["wild"] for die in parsed_dice["dice"]))
+        self.modifier = parsed_dice["modifier"]
+        # Roll labels (e.g. "d6e") are built once here instead of once per roll
+        self.labels = tuple(
+            "d" + str(sides) + ("e" if exploding else "")
+            for sides, exploding in zip(self.sides, self.exploding)
+        )
+        kept_counts = [keep or count for count, keep in zip(self.counts, self.keep)]
+        self.minimum = sum(kept_counts) + self.modifier
+        if any(self.exploding) or any(self.wild):
+            self.maximum = float("inf")
+        else:
+            self.maximum = (
+                sum(count * sides for count, sides in zip(kept_counts, self.sides))
+                + self.modifier
+            )
+        # The average of a group keeping only some of its dice needs its order statistics,
+        # so it is left to the engines (see dice_average in ExplodingDiceSimulator)
+        if any(self.keep):
+            self.mean = None
+            return
+        # Exploding dice average (n+1)/2 * n/(n-1), see precise_average_exploding_die
+        self.mean = self.modifier
+        for count, sides, exploding in zip(self.counts, self.sides, self.exploding):
+            average = sides / 2 + 0.5
+            if exploding:
+                average = average * sides / (sides - 1) if sides > 1 else float("inf")
+            self.mean += count * average
+
+    def group_dice(self, group):
+        """List the dice rolled for a die group as (count, sides, exploding) tuples, its wild die included"""
+        dice = [(self.counts[group], self.sides[group], self.exploding[group])]
+        if self.wild[group]:
+            dice.append((1, WILD_DIE_SIDES, 1))
+        return dice
+
+    def kept_total(self, group, die_totals):
+        """Add up the totals of the dice of a die group that it keeps"""
+        die_totals.sort()
+        if self.keep_lowest[group]:
+            return sum(die_totals[: self.keep[group]])
+        return sum(die_totals[-self.keep[group] :])
+
+    def roll(self, rng=random, stats=None):
+        """Roll the dice and return the total and the rolls (see roll_dice)
+        If a SimulationStats is given, the dice rolled and explosions per depth are counted in it
+        """
+        rolls = []
+        total = self.modifier
+        for group, (count, sides, exploding, label) in enumerate(
+            zip(self.counts, self.sides, self.exploding, self.labels)
+        ):
+            dice = [(sides, exploding, label)] * count
+            if self.wild[group]:
+                dice.append((WILD_DIE_SIDES, 1, "d" + str(WILD_DIE_SIDES) + "e"))
+            # Every die is recorded, but only the kept ones count towards the total
+            die_totals = []
+            for die_sides, die_exploding, die_label in dice:
+                roll = rng.randint(1, die_sides)
+                die_total = roll
+                unit_rolls = [(die_label, roll)]
+                while die_exploding and roll == die_sides:
+                    roll = rng.randint(1, die_sides)
+                    die_total += roll
+                    unit_rolls.append((die_label, roll))
+                if len(unit_rolls) > 1:
+                    rolls.append(unit_rolls)
+                else:
+                    rolls.append(unit_rolls[0])
+                if stats is not None:
+                    stats.record_die(len(unit_rolls) - 1)
+                die_totals.append(die_total)
+            if self.keep[group]:
+                total += self.kept_total(group, die_totals)
+            else:
+                total += sum(die_totals)
+        return (total, rolls)
+
+    def roll_total(self, rng=random, stats=None):
+        """Roll the dice and return only the total, without recording the individual rolls
+        If a SimulationStats is given, the dice rolled and explosions per depth are counted in it
+        """
+        randint = rng.randint
+        total = self.modifier
+        for group, (count, sides, exploding) in enumerate(
+            zip(self.counts, self.sides, self.exploding)
+        ):
+            if self.keep[group]:
+                die_totals = []
+                for die_count, die_sides, die_exploding in self.group_dice(group):
+                    for _ in range(die_count):
+                        roll = die_total = randint(1, die_sides)
+                        explosions = 0
+                        while die_exploding and roll == die_sides:
+                            roll = randint(1, die_sides)
+                            die_total += roll
+                            explosions += 1
+                        if stats is not None:
+                            stats.record_die(explosions)
+                        die_totals.append(die_total)
+                total += self.kept_total(group, die_totals)
+                continue
+            for _ in range(count):
+                roll = randint(1, sides)
+                total += roll
+                explosions = 0
+                while exploding and roll == sides:
+                    roll = randint(1, sides)
+                    total += roll
+                    explosions += 1
+                if stats is not None:
+                    stats.record_die(explosions)
+        return total
+
+
+def normalize_dice_string(dice_string):
+    """Normalize a dice string so that equivalent spellings (case, whitespace) share a cache entry"""
+    return "".join(dice_string.split()).lower()
+
+
+@lru_cache(maxsize=COMPILED_EXPRESSION_CACHE_SIZE)
+def _compile_normalized_dice_string(dice_string):
+    return DiceExpression(dice_string)
+
+
+def compile_dice_string(dice_string):
+    """Get the compiled DiceExpression for a dice string, parsing it only the first time it is seen"""
+    if isinstance(dice_string, DiceExpression):
+        return dice_string
+    return _compile_normalized_dice_string(normalize_dice_string(dice_string))
+
+
+def canonical_dice_string(dice_string):
+    """Write a dice string in a canonical form, so that equivalent pools (e.g. "1d8e+1d6e" and "1d6e+1d8e") match"""
+    expression = compile_dice_string(dice_string)
+    counts = {}
+    # Groups that keep only some of their dice cannot be merged with others
+    kept_tokens = []
+    for group, (count, sides, exploding) in enumerate(
+        zip(expression.counts, expression.sides, expression.exploding)
+    ):
+        token = str(count) + "d" + str(sides) + ("e" if exploding else "")
+        if expression.wild[group]:
+            kept_tokens.append(token + "w")
+        elif expression.keep[group]:
+            keep = "kl" if expression.keep_lowest[group] else "kh"
+            kept_tokens.append(token + keep + str(expression.keep[group]))
+        else:
+            counts[(sides, exploding)] = counts.get((sides, exploding), 0) + count
+    tokens = [
+        str(count) + "d" + str(sides) + ("e" if exploding else "")
+        for (sides, exploding), count in sorted(counts.items())
+    ] + sorted(kept_tokens)
+    if expression.modifier != 0 or not tokens:
+        tokens.append(str(expression.modifier))
+    return "+".join(tokens).replace("+-", "-")
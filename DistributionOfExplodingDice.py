@@ -0,0 +1,318 @@
+import itertools
+import math
+from functools import lru_cache
+
+import numpy as np
+
+from DiceStrings import compile_dice_string
+from ExplodingDieTables import (
+    STANDARD_DIE_SIZES,
+    TABLE_MAX_EXPLOSIONS,
+    exploding_die_pmf_table,
+)
+
+# Explosion chains are cut off once the probability of continuing drops below this value
+TAIL_EPSILON = 1e-12
+# Convolutions whose output would be at least this long are done with an FFT instead of directly
+FFT_CONVOLUTION_THRESHOLD = 500
+# FFT outputs below this fraction of their largest value are rounding noise, and are zeroed
+FFT_NOISE_FLOOR = 1e-12
+# Survival odds are reliable while the probability dropped from the tails (and lost to rounding)
+# is at most this fraction of them
+SURVIVAL_RELATIVE_TOLERANCE = 1e-4
+
+
+def exploding_die_pmf(sides, exploding=True, epsilon=TAIL_EPSILON):
+    """
+    Calculate the probability mass function of a single die.
+    :param sides: The number of sides on the die.
+    :param exploding: Whether the die explodes on its maximum value.
+    :param epsilon: Explosion chains less likely than this are dropped from the tail.
+    :return: An array where index v holds the probability of the die totalling v.
+    """
+    if not exploding or sides < 2:
+        pmf = np.zeros(sides + 1)
+        pmf[1:] = 1 / sides
+        return pmf
+    # A total of k * sides + r (with 1 <= r < sides) needs k explosions followed by r,
+    # so its probability is (1/sides) ^ (k+1)
+    explosions = 0
+    while (1 / sides) ** (explosions + 1) >= epsilon:
+        explosions += 1
+    # Standard dice are copied straight out of the precomputed tables when they are deep enough
+    if sides in STANDARD_DIE_SIZES and explosions <= TABLE_MAX_EXPLOSIONS:
+        return np.array(exploding_die_pmf_table(sides)[: (explosions + 1) * sides])
+    pmf = np.zeros((explosions + 1) * sides)
+    for k in range(explosions + 1):
+        pmf[k * sides + 1 : (k + 1) * sides] = (1 / sides) ** (k + 1)
+    return pmf
+
+
+def convolve_pmfs(a, b):
+    """
+    Calculate the probability mass function of the sum of two independent variables.
+    :param a: The first probability mass function.
+    :param b: The second probability mass function.
+    :return: The probability mass function of the sum.
+    """
+    size = len(a) + len(b) - 1
+    if size < FFT_CONVOLUTION_THRESHOLD:
+        return np.convolve(a, b)
+    result = np.fft.irfft(np.fft.rfft(a, size) * np.fft.rfft(b, size), size)
+    # Floating point noise from the FFT leaves tiny (even negative) probabilities where there should be none
+    result[result < FFT_NOISE_FLOOR * result.max()] = 0
+    return result
+
+
+def _add_padded(a, b):
+    # Add two arrays of possibly different lengths, padding the shorter one with zeros
+    if len(a) < len(b):
+        a, b = b, a
+    result = a.copy()
+    result[: len(b)] += b
+    return result
+
+
+def kept_dice_pmf(dice, keep, lowest=False, epsilon=TAIL_EPSILON):
+    """
+    Calculate the probability mass function of the total of the highest (or lowest) dice of a set.
+    Keeping a single die is the maximum (or minimum), whose CDF (or survival function) is the product of the dice's.
+    Otherwise the dice are given values from the highest down (or the lowest up), tracking how many dice of each kind
+    have been given a value and the total of those kept so far; dice sharing a value are interchangeable,
+    so only how many of each kind share it matters.
+    :param dice: The dice as (count, sides, exploding) tuples.
+    :param keep: The number of dice kept.
+    :param lowest: Whether the lowest dice are kept instead of the highest.
+    :param epsilon: Explosion chains less likely than this are dropped from each die.
+    :return: An array where index v holds the probability of the kept dice totalling v.
+    """
+    pmfs = [
+        _cached_die_pmf(sides, bool(exploding), epsilon) for _, sides, exploding in dice
+    ]
+    counts = [count for count, _, _ in dice]
+    length = max(len(pmf) for pmf in pmfs)
+    pmfs = [np.pad(pmf, (0, length - len(pmf))) for pmf in pmfs]
+    if keep == 1:
+        if lowest:
+            # P(min >= v) is the product of each die's P(die >= v)
+            survival = np.ones(length)
+            for count, pmf in zip(counts, pmfs):
+                survival *= np.cumsum(pmf[::-1])[::-1] ** count
+            return survival - np.append(survival[1:], 0)
+        # P(max <= v) is the product of each die's P(die <= v)
+        cdf = np.ones(length)
+        for count, pmf in zip(counts, pmfs):
+            cdf *= np.cumsum(pmf) ** count
+        return cdf - np.insert(cdf[:-1], 0, 0)
+    values = range(1, length) if lowest else range(length - 1, 0, -1)
+    # states[placed] is an array over the kept total, placed[i] being how many of dice[i] have been given a value
+    states = {tuple(0 for _ in dice): np.ones(1)}
+    for value in values:
+        next_states = {}
+        for placed, totals in states.items():
+            remaining = [count - done for count, done in zip(counts, placed)]
+            # Choose how many of each kind of die take this value
+            for taking in itertools.product(*(range(left + 1) for left in remaining)):
+                weight = 1.0
+                for left, taken, pmf in zip(remaining, taking, pmfs):
+                    weight *= math.comb(left, taken) * pmf[value] ** taken
+                if weight == 0:
+                    continue
+                kept = min(sum(taking), max(0, keep - sum(placed)))
+                shifted = np.concatenate((np.zeros(value * kept), totals * weight))
+                key = tuple(done + taken for done, taken in zip(placed, taking))
+                if key in next_states:
+                    next_states[key] = _add_padded(next_states[key], shifted)
+                else:
+                    next_states[key] = shifted
+        states = next_states
+    # Dice left without a value rolled beyond the truncated tail; kept lowest, that only matters if they would be kept
+    pmf = np.zeros(1)
+    tails = [max(0.0, 1 - pmf_of_die.sum()) for pmf_of_die in pmfs]
+    for placed, totals in states.items():
+        if placed == tuple(counts):
+            pmf = _add_padded(pmf, totals)
+        elif lowest and sum(placed) >= keep:
+            weight = 1.0
+            for count, done, tail in zip(counts, placed, tails):
+                weight *= tail ** (count - done)
+            pmf = _add_padded(pmf, totals * weight)
+    return pmf
+
+
+def sum_distribution(dice_string, epsilon=TAIL_EPSILON):
+    """
+    Calculate the full distribution of the total of a dice string.
+    :param dice_string: A dice string such as "2d6e+1d8e-2" (or its compiled DiceExpression).
+    :param epsilon: Explosion chains less likely than this are dropped from each die.
+    :return: {
+        "offset": int (the total represented by index 0),
+        "pmf": array (index i holds the probability of totalling i + offset),
+        "survival": array (index i holds the probability of totalling i + offset or more),
+        "reliable": int (survival odds from this index on may be too low, see SURVIVAL_RELATIVE_TOLERANCE)
+    }
+    """
+    expression = compile_dice_string(dice_string)
+    pmf = np.ones(1)
+    for group, (count, sides, exploding) in enumerate(
+        zip(expression.counts, expression.sides, expression.exploding)
+    ):
+        if expression.keep[group]:
+            group_pmf = kept_dice_pmf(
+                expression.group_dice(group),
+                expression.keep[group],
+                expression.keep_lowest[group],
+                epsilon,
+            )
+            pmf = convolve_pmfs(pmf, group_pmf)
+            continue
+        die_pmf = exploding_die_pmf(sides, exploding, epsilon)
+        for _ in range(count):
+            pmf = convolve_pmfs(pmf, die_pmf)
+    # Only totals the dice can actually roll are kept, which drops the leading zeros (and any rounding noise)
+    start = expression.minimum - expression.modifier
+    end = expression.maximum - expression.modifier + 1
+    pmf = pmf[start:end] if end != float("inf") else pmf[start:]
+    # Survival is the reversed running total of the probabilities
+    survival = np.cumsum(pmf[::-1])[::-1]
+    # The explosion chains dropped from the tails only ever make the survival odds too low, by at most the
+    # probability missing from the distribution (plus the rounding of every value)
+    error = max(1 - math.fsum(pmf), 0.0) + len(pmf) * np.finfo(float).eps * pmf.max()
+    return {
+        "offset": start + expression.modifier,
+        "pmf": pmf,
+        "survival": survival,
+        "reliable": int(
+            np.count_nonzero(survival >= error / SURVIVAL_RELATIVE_TOLERANCE)
+        ),
+    }
+
+
+def probability_at_least(distribution, target):
+    """Return the probability of a distribution from sum_distribution totalling the target or more."""
+    index = target - distribution["offset"]
+    if index <= 0:
+        return 1.0
+    if index >= len(distribution["survival"]):
+        return 0.0
+    return float(distribution["survival"][index])
+
+
+def reliable_probability_at_least(distribution, target):
+    """
+    Return the probability of a distribution from sum_distribution totalling the target or more,
+    or None when the target is past the reliable part of its survival odds (so it should be counted exactly).
+    """
+    if target - distribution["offset"] >= distribution["reliable"]:
+        return None
+    return probability_at_least(distribution, target)
+
+
+@lru_cache(maxsize=None)
+def _cached_die_pmf(sides, exploding, epsilon):
+    # Shared between pools, so the returned arrays must never be modified
+    return exploding_die_pmf(sides, exploding, epsilon)
+
+
+class PoolDistribution:
+    """
+    The distribution of the total of a pool of dice, kept up to date as dice are added or removed.
+    Adding a die costs one convolution. The distribution after each die is kept (a prefix structure),
+    so removing the most recently added die is free and removing an earlier one only redoes the dice after it.
+    """
+
+    def __init__(self, dice_string=None, epsilon=TAIL_EPSILON):
+        self.epsilon = epsilon
+        self.modifier = 0
+        # dice[i] is (sides, exploding), prefixes[i] is the distribution of the first i dice
+        self.dice = []
+        self.prefixes = [np.ones(1)]
+        self._survival = None
+        if dice_string is not None:
+            expression = compile_dice_string(dice_string)
+            if any(expression.keep):
+                raise ValueError(
+                    "Pools that keep only some of their dice cannot be updated a die at a time"
+                )
+            for count, sides, exploding in zip(
+                expression.counts, expression.sides, expression.exploding
+            ):
+                for _ in range(count):
+                    self.add_die(sides, bool(exploding))
+            self.modifier = expression.modifier
+
+    def add_die(self, sides, exploding=True):
+        """Add a die to the pool with a single convolution, returning the pool."""
+        die_pmf = _cached_die_pmf(sides, exploding, self.epsilon)
+        self.dice.append((sides, exploding))
+        self.prefixes.append(convolve_pmfs(self.prefixes[-1], die_pmf))
+        self._survival = None
+        return self
+
+    def remove_die(self, sides, exploding=True):
+        """Remove the most recently added matching die from the pool, returning the pool."""
+        matches = [
+            index for index, die in enumerate(self.dice) if die == (sides, exploding)
+        ]
+        if not matches:
+            raise ValueError(
+                f"No d{sides}{'e' if exploding else ''} in the pool to remove"
+            )
+        index = matches[-1]
+        # Go back to the distribution before the removed die, then re-add the dice that came after it
+        later_dice = self.dice[index + 1 :]
+        del self.dice[index:]
+        del self.prefixes[index + 1 :]
+        for later_sides, later_exploding in later_dice:
+            self.add_die(later_sides, later_exploding)
+        self._survival = None
+        return self
+
+    def copy(self):
+        """Copy the pool, so that 'what if' variants can be explored without changing it."""
+        pool = PoolDistribution(epsilon=self.epsilon)
+        pool.modifier = self.modifier
+        # The distributions themselves are never modified, so they can be shared
+        pool.dice = list(self.dice)
+        pool.prefixes = list(self.prefixes)
+        pool._survival = self._survival
+        return pool
+
+    def with_modifier(self, modifier):
+        """Return a copy of the pool with a different modifier (free, as the modifier only shifts the total)."""
+        pool = self.copy()
+        pool.modifier = modifier
+        return pool
+
+    @property
+    def pmf(self):
+        """An array where index i holds the probability of the dice totalling i (before the modifier)."""
+        return self.prefixes[-1]
+
+    @property
+    def survival(self):
+        """An array where index i holds the probability of the dice totalling i or more (before the modifier)."""
+        if self._survival is None:
+            self._survival = np.cumsum(self.pmf[::-1])[::-1]
+        return self._survival
+
+    def probability_at_least(self, target):
+        """Return the probability of the pool (with its modifier) totalling the target or more."""
+        index = target - self.modifier
+        if index <= 0:
+            return 1.0
+        if index >= len(self.survival):
+            return 0.0
+        return float(self.survival[index])
+
+
+# Test the function when this file is executed as the main module
+if __name__ == "__main__":
+    print("Distribution: Sum of Exploding Dice")
+
+    for dice_string, target in [("1d4e+2d6e", 30), ("1d4e+1d8e", 8), ("1d4e", 4)]:
+        distribution = sum_distribution(dice_string)
+        print(
+            f"Probability of rolling {target} or higher with {dice_string}:",
+            f"{probability_at_least(distribution, target) * 100:.5f}%",
+        )
@@ -0,0 +1,314 @@
+import itertools
+import math
+from fractions import Fraction
+
+from DiceStrings import compile_dice_string
+
+
+def exact_odds_exploding_die(sides, target_number):
+    """
+    Calculate the exact odds of an exploding die rolling at or above a target number.
+    p = (n - ((t-1) % n)) / n ^ (floor((t-1) / n) + 1)
+    :return: The odds as a Fraction.
+    """
+    if target_number <= 1:
+        return Fraction(1)
+    explosions, remainder = divmod(target_number - 1, sides)
+    return Fraction(sides - remainder, sides ** (explosions + 1))
+
+
+def exact_odds_of_alternatives(probabilities):
+    """
+    Calculate the exact odds of any of a set of independent probabilities occurring.
+    Floats are converted to the exact binary fractions they hold, so 1 - prod(1 - p) loses nothing however small p is.
+    :return: The odds as a Fraction.
+    """
+    odds_of_all_failures = Fraction(1)
+    for p in probabilities:
+        odds_of_all_failures *= 1 - Fraction(p)
+    return 1 - odds_of_all_failures
+
+
+def die_counts_below(sides, exploding, limit):
+    """
+    Count the ways a single die can total each value below a limit, over a common denominator.
+    An exploding die totals k * sides + r (with 1 <= r < sides) with probability 1 / sides ^ (k+1),
+    so over the denominator sides ^ (K+1) (K being the most explosions that stay below the limit)
+    that value has sides ^ (K-k) ways.
+    :return: ([(value, ways)], denominator)
+    """
+    # A one-sided die always rolls its maximum, so it is treated as not exploding (see exploding_die_pmf)
+    if not exploding or sides < 2:
+        return [(value, 1) for value in range(1, min(sides, limit - 1) + 1)], sides
+    most_explosions = (limit - 2) // sides
+    ways = [
+        (value, sides ** (most_explosions - (value - 1) // sides))
+        for value in range(1, limit)
+        if value % sides != 0
+    ]
+    return ways, sides ** (most_explosions + 1)
+
+
+def convolve_counts_below(ways, die_ways, limit):
+    """
+    Combine the ways of totalling each value below a limit with those of an independent die (or die group).
+    :param ways: A list where index v holds the number of ways of totalling v.
+    :param die_ways: The die's [(value, ways)], in increasing order of value.
+    :return: The list of the number of ways the sum totals each value below the limit.
+    """
+    combined = [0] * limit
+    for total, total_ways in enumerate(ways):
+        if total_ways == 0:
+            continue
+        for value, value_ways in die_ways:
+            if total + value >= limit:
+                break
+            combined[total + value] += total_ways * value_ways
+    return combined
+
+
+def kept_counts_below(dice, keep, lowest, limit):
+    """
+    Count the ways the highest (or lowest) dice of a set can total each value below a limit, over a common denominator.
+    Dice are given values from the highest down (or the lowest up), as in kept_dice_pmf. Kept highest, every die
+    must roll below the limit for the kept total to; kept lowest, the dice left over may roll anything from the limit up
+    as long as they are not kept.
+    :param dice: The dice as (count, sides, exploding) tuples.
+    :return: ([(total, ways)], denominator)
+    """
+    counts = [count for count, _, _ in dice]
+    kinds = [die_counts_below(sides, exploding, limit) for _, sides, exploding in dice]
+    die_ways = [dict(ways) for ways, _ in kinds]
+    # The ways each kind of die rolls the limit or more
+    die_ways_above = [
+        denominator - sum(ways.values())
+        for ways, (_, denominator) in zip(die_ways, kinds)
+    ]
+    denominator = 1
+    for count, (_, die_denominator) in zip(counts, kinds):
+        denominator *= die_denominator**count
+    values = range(1, limit) if lowest else range(limit - 1, 0, -1)
+    # states[placed] is a list over the kept total, placed[i] being how many of dice[i] have been given a value
+    states = {tuple(0 for _ in dice): [1] + [0] * (limit - 1)}
+    for value in values:
+        next_states = {}
+        for placed, totals in states.items():
+            remaining = [count - done for count, done in zip(counts, placed)]
+            for taking in itertools.product(*(range(left + 1) for left in remaining)):
+                weight = 1
+                for left, taken, ways in zip(remaining, taking, die_ways):
+                    weight *= math.comb(left, taken) * ways.get(value, 0) ** taken
+                if weight == 0:
+                    continue
+                shift = value * min(sum(taking), max(0, keep - sum(placed)))
+                key = tuple(done + taken for done, taken in zip(placed, taking))
+                next_totals = next_states.setdefault(key, [0] * limit)
+                for total in range(limit - shift):
+                    if totals[total]:
+                        next_totals[total + shift] += totals[total] * weight
+        states = next_states
+    ways = [0] * limit
+    for placed, totals in states.items():
+        if placed == tuple(counts):
+            weight = 1
+        elif lowest and sum(placed) >= keep:
+            weight = 1
+            for count, done, ways_above in zip(counts, placed, die_ways_above):
+                weight *= ways_above ** (count - done)
+        else:
+            continue
+        for total, total_ways in enumerate(totals):
+            ways[total] += total_ways * weight
+    return [(total, ways[total]) for total in range(limit) if ways[total]], denominator
+
+
+def exact_counts_below(dice_string, limit):
+    """
+    Count the ways the dice of a dice string (leaving out its modifier) total each value below a limit,
+    over a common denominator. The counts answer every target number up to the limit, as the ways of
+    totalling less than t are the sum of the first t of them.
+    :return: (a list where index v holds the number of ways of totalling v, denominator)
+    """
+    expression = compile_dice_string(dice_string)
+    # ways[v] is the number of ways the dice so far total v, out of `denominator`
+    ways = [1] + [0] * (limit - 1)
+    denominator = 1
+    for group, (count, sides, exploding) in enumerate(
+        zip(expression.counts, expression.sides, expression.exploding)
+    ):
+        if expression.keep[group]:
+            group_ways, group_denominator = kept_counts_below(
+                expression.group_dice(group),
+                expression.keep[group],
+                expression.keep_lowest[group],
+                limit,
+            )
+            ways = convolve_counts_below(ways, group_ways, limit)
+            denominator *= group_denominator
+            continue
+        die_ways, die_denominator = die_counts_below(sides, exploding, limit)
+        for _ in range(count):
+            ways = convolve_counts_below(ways, die_ways, limit)
+            denominator *= die_denominator
+    return ways, denominator
+
+
+def exact_success_odds(dice_string, target_number):
+    """
+    Calculate the exact odds of a dice string rolling at or above a target number.
+    Only the finitely many totals below the target matter, so the dice's ways of totalling each of them
+    are convolved with integers alone, and the odds are 1 - (ways below the target / every way).
+    :return: The odds as a Fraction.
+    """
+    expression = compile_dice_string(dice_string)
+    # Get the effective target number by subtracting the modifier
+    limit = target_number - expression.modifier
+    if limit <= expression.minimum - expression.modifier:
+        return Fraction(1)
+    ways, denominator = exact_counts_below(expression, limit)
+    return Fraction(denominator - sum(ways), denominator)
+
+
+def exact_die_average(sides, exploding):
+    """Exploding dice average (n+1)/2 * n/(n-1), see precise_average_exploding_die."""
+    average = Fraction(sides + 1, 2)
+    # A one-sided die always rolls its maximum, so it is treated as not exploding (see exploding_die_pmf)
+    if exploding and sides > 1:
+        average *= Fraction(sides, sides - 1)
+    return average
+
+
+def joint_survival_sum(dice):
+    """
+    Sum the odds of every die in a set rolling t or more, over every t from 1 up.
+    Past a common multiple L of their sides, every exploding die's odds of rolling t + L or more are
+    (1/n) ^ (L/n) times its odds of rolling t or more, so the sum is that of the first L terms over a geometric series.
+    :param dice: The dice as (count, sides, exploding) tuples.
+    :return: The sum as a Fraction.
+    """
+
+    def joint_survival(target_number):
+        odds = Fraction(1)
+        for count, sides, exploding in dice:
+            if exploding and sides > 1:
+                odds *= exact_odds_exploding_die(sides, target_number) ** count
+            else:
+                odds *= Fraction(max(0, sides - target_number + 1), sides) ** count
+        return odds
+
+    if any(not exploding or sides < 2 for _, sides, exploding in dice):
+        # A die that does not explode ends the sum at its number of sides
+        last = min(sides for _, sides, exploding in dice if not exploding or sides < 2)
+        return sum(joint_survival(target) for target in range(1, last + 1))
+    period = math.lcm(*(sides for _, sides, _ in dice))
+    ratio = Fraction(1)
+    for count, sides, _ in dice:
+        ratio *= Fraction(1, sides) ** (period // sides * count)
+    first_period = sum(joint_survival(target) for target in range(1, period + 1))
+    return first_period / (1 - ratio)
+
+
+def kept_dice_average(dice, keep, lowest=False):
+    """
+    Calculate the exact average total of the highest (or lowest) dice of a set.
+    The highest K dice total the sum over t >= 1 of min(C_t, K), C_t being the number of dice rolling t or more,
+    and by inclusion-exclusion P(C_t >= j) is the sum over m >= j of (-1)^(m-j) * (m-1 choose j-1) times
+    the odds of each set of m dice all rolling t or more, whose sums over t are found by joint_survival_sum.
+    The lowest K dice total all the dice less the highest N-K.
+    :param dice: The dice as (count, sides, exploding) tuples.
+    :param keep: The number of dice kept.
+    :param lowest: Whether the lowest dice are kept instead of the highest.
+    :return: The average as a Fraction.
+    """
+    if lowest:
+        number = sum(count for count, _, _ in dice)
+        average = sum(
+            count * exact_die_average(sides, exploding)
+            for count, sides, exploding in dice
+        )
+        if keep < number:
+            average -= kept_dice_average(dice, number - keep)
+        return average
+    average = Fraction(0)
+    # Sets of dice are counted by how many of each kind they hold, as the dice of a kind are interchangeable
+    for chosen in itertools.product(*(range(count + 1) for count, _, _ in dice)):
+        size = sum(chosen)
+        if size == 0:
+            continue
+        coefficient = sum(
+            (-1) ** (size - at_least) * math.comb(size - 1, at_least - 1)
+            for at_least in range(1, min(keep, size) + 1)
+        )
+        if coefficient == 0:
+            continue
+        sets = 1
+        for count, number in zip((count for count, _, _ in dice), chosen):
+            sets *= math.comb(count, number)
+        average += (
+            coefficient
+            * sets
+            * joint_survival_sum(
+                [
+                    (number, sides, exploding)
+                    for number, (_, sides, exploding) in zip(chosen, dice)
+                    if number
+                ]
+            )
+        )
+    return average
+
+
+def exact_dice_average(dice_string):
+    """
+    Calculate the exact average of a dice string.
+    :return: The average as a Fraction.
+    """
+    expression = compile_dice_string(dice_string)
+    average = Fraction(expression.modifier)
+    for group, (count, sides, exploding) in enumerate(
+        zip(expression.counts, expression.sides, expression.exploding)
+    ):
+        if expression.keep[group]:
+            average += kept_dice_average(
+                expression.group_dice(group),
+                expression.keep[group],
+                expression.keep_lowest[group],
+            )
+        else:
+            average += count * exact_die_average(sides, exploding)
+    return average
+
+
+def certify(estimate, exact, interval=None):
+    """
+    Measure how far a float or simulated result is from the exact answer.
+    :param estimate: The result to check.
+    :param exact: The exact answer (e.g. from exact_success_odds).
+    :param interval: The (lower, upper) confidence interval given with a simulated estimate, if any.
+    :return: { exact: float, absolute_error: float, relative_error: float or None, within_interval: bool or None }
+    """
+    error = abs(Fraction(estimate) - exact)
+    return {
+        "exact": float(exact),
+        "absolute_error": float(error),
+        "relative_error": float(error / exact) if exact != 0 else None,
+        "within_interval": (
+            Fraction(interval[0]) <= exact <= Fraction(interval[1])
+            if interval is not None
+            else None
+        ),
+    }
+
+
+# Test the functions when this file is executed as the main module
+if __name__ == "__main__":
+    print("Exact: Sum of Exploding Dice")
+
+    for dice_string, target in [("1d4e+2d6e", 30), ("1d4e+1d8e", 8), ("1d4e", 60)]:
+        odds = exact_success_odds(dice_string, target)
+        print(
+            f"Odds of rolling {target} or higher with {dice_string}: {odds} ~ {float(odds):.6e}"
+        )
+
+    for dice_string in ["1d4e+2d6e", "1d4e+1d8e+3"]:
+        print(f"Average of {dice_string}: {exact_dice_average(dice_string)}")
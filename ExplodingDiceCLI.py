@@ -0,0 +1,177 @@
+import argparse
+import json
+import sys
+
+from BatchQueries import run_batch
+from ExplodingDiceSimulator import (
+    SUCCESS_ODDS_DEFAULT_PRECISION,
+    display_dice_average,
+    display_exact_dice_average,
+    display_exact_success_odds,
+    display_success_odds,
+    display_survival_table,
+    menu_loop,
+    new_menu_loop,
+)
+from ResultCache import DEFAULT_CACHE_PATH, ResultCache
+from SimulationStats import SimulationStats
+
+# The command line of the dice simulator, kept apart from it so that the batch runner
+# (which builds on the simulator) can be dispatched to without importing it back
+
+
+def parse_precision(precision_string):
+    """Parse a precision given either as a probability (0.0001) or as a percentage (0.01%)"""
+    if precision_string.endswith("%"):
+        return float(precision_string[:-1]) / 100
+    return float(precision_string)
+
+
+def parse_arguments(arguments):
+    """Parse the command line arguments of the dice simulator program"""
+    parser = argparse.ArgumentParser(description="Simulate rolls of exploding dice.")
+    parser.add_argument(
+        "query",
+        nargs="*",
+        help="dice strings to average, 'target T NdMe±X' or 'table NdMe±X' (starts the menu if empty)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="number of processes to split simulations across",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help="seed for reproducible results (the same for any number of workers)",
+    )
+    parser.add_argument(
+        "--precision",
+        type=parse_precision,
+        default=SUCCESS_ODDS_DEFAULT_PRECISION,
+        help="stop simulating odds once they are this accurate, as a probability or percentage (e.g. 0.01%%)",
+    )
+    parser.add_argument(
+        "--method",
+        choices=["exact", "simulated"],
+        help="how odds tables are calculated (exact when NumPy is available)",
+    )
+    parser.add_argument(
+        "--output", help="CSV or JSON file to save an odds table or batch results to"
+    )
+    parser.add_argument(
+        "--batch",
+        help="CSV or JSON lines file of queries (dice, target) to evaluate, grouped by pool",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="report trials, dice rolled, explosions and time per phase after each target or average query",
+    )
+    parser.add_argument(
+        "--profile-output", help="also save the profile reports to this JSON file"
+    )
+    parser.add_argument(
+        "--cache",
+        nargs="?",
+        const=DEFAULT_CACHE_PATH,
+        help=f"reuse odds and averages saved in a SQLite cache file (default {DEFAULT_CACHE_PATH})",
+    )
+    parser.add_argument(
+        "--log",
+        nargs="?",
+        const="ndjson",
+        choices=["ndjson", "ndjson.gz"],
+        help="stream every averaged roll to a log file named after the dice string (ndjson.gz to compress it)",
+    )
+    parser.add_argument(
+        "--exact",
+        action="store_true",
+        help="calculate target odds and averages exactly as fractions instead of simulating them",
+    )
+    parser.add_argument(
+        "--precise-menu",
+        action="store_true",
+        help="start the menu of precise (not simulated) odds of alternative dice instead of the simulator menu",
+    )
+    return parser.parse_args(arguments)
+
+
+def main(arguments):
+    """Main function to run the dice simulator program"""
+    options = parse_arguments(arguments)
+    cache = ResultCache(options.cache) if options.cache is not None else None
+    query = options.query
+    if options.batch is not None:
+        run_batch(
+            options.batch,
+            options.output,
+            options.workers,
+            options.method,
+            options.seed,
+        )
+    elif len(query) > 0:
+        # One profile per target or average query, when profiling
+        profiles = []
+        if options.exact and query[0] != "table":
+            if query[0] == "target" and len(query) == 3:
+                display_exact_success_odds(query[2], int(query[1]))
+            else:
+                for dice_string in query:
+                    display_exact_dice_average(dice_string)
+        elif query[0] == "target" and len(query) == 3:
+            target = int(query[1])
+            dice_string = query[2]
+            stats = SimulationStats() if options.profile else None
+            display_success_odds(
+                dice_string,
+                target,
+                options.workers,
+                options.seed,
+                options.precision,
+                cache=cache,
+                stats=stats,
+            )
+            profiles.append((f"target {target} {dice_string}", stats))
+        elif query[0] == "table" and len(query) == 2:
+            display_survival_table(
+                query[1], options.method, options.output, options.workers, options.seed
+            )
+        else:
+            for dice_string in query:
+                stats = SimulationStats() if options.profile else None
+                display_dice_average(
+                    dice_string,
+                    options.workers,
+                    options.seed,
+                    cache,
+                    options.log,
+                    stats,
+                )
+                profiles.append((dice_string, stats))
+        if options.profile:
+            for name, stats in profiles:
+                print(f"Profile of {name}:\n{stats.report()}\n")
+            if options.profile_output is not None:
+                with open(options.profile_output, "w") as file:
+                    json.dump(
+                        {name: stats.as_dict() for name, stats in profiles},
+                        file,
+                        indent=4,
+                    )
+    elif options.precise_menu:
+        new_menu_loop()
+    else:
+        menu_loop(
+            options.workers,
+            options.seed,
+            options.precision,
+            options.method,
+            cache,
+            options.log,
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -2,10 +2,56 @@ import random
 import json
 import datetime
 import sys
+import csv
+import math
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
+from DiceStrings import canonical_dice_string, compile_dice_string
+from ExactExplodingDice import (
+    exact_dice_average,
+    exact_odds_exploding_die,
+    exact_odds_of_alternatives,
+    exact_success_odds,
+)
+from ResultCache import ResultCache
+from RollLog import RollLogWriter
+from SimulationStats import SimulationStats
+
+# NumPy is optional; without it the simulator falls back to rolling one trial at a time
+try:
+    import numpy as np
+except ImportError:
+    np = None
+# The precomputed single die tables and the distribution engine need NumPy too;
+# without them single die odds use the closed form and every other pool is simulated
+if np is not None:
+    from DistributionOfExplodingDice import (
+        reliable_probability_at_least,
+        sum_distribution,
+    )
+    from ExplodingDieTables import exploding_die_survival
+else:
+    exploding_die_survival = None
 
 DICE_AVERAGES_SIMULATION_STEPS = 30000
-SUCCESS_ODDS_BASE_SIMULATION_STEPS = 5000000
 SUCCESS_ODDS_MAXIMUM_SIMULATION_STEPS = 50000000
+# Success odds are simulated until the confidence interval is at most this far either side of the estimate
+SUCCESS_ODDS_DEFAULT_PRECISION = 0.0005
+# z-score of the confidence interval reported with success odds (95%)
+SUCCESS_ODDS_CONFIDENCE_Z = 1.96
+SIMULATION_BATCH_SIZE = 1000000
+# Simulations are split into chunks of this many trials, each with its own seed derived from the simulation's seed
+SIMULATION_CHUNK_SIZE = 250000
+# Targets more than this many times the mean's distance from the minimum above the mean use importance sampling
+IMPORTANCE_SAMPLING_TAIL_FACTOR = 3
+# Importance sampling stops once the confidence interval is within this fraction of the estimate
+IMPORTANCE_SAMPLING_RELATIVE_PRECISION = 0.01
+IMPORTANCE_SAMPLING_MAXIMUM_SIMULATION_STEPS = 1000000
+# Survival tables list every target number until the odds of reaching it drop below this value
+TABLE_TAIL_CUTOFF = 1e-6
+TABLE_SIMULATION_STEPS = 5000000
 AVERAGES_PRECISION = 2
 PERCENTAGES_PRECISION = 4
 
@@ -13,137 +59,662 @@ PERCENTAGES_PRECISION = 4
 # Dice come in the form of dice strings (e.g. 2d6, 3d4, 1d8) and may include a modifier (e.g. 2d6+3, 3d4-1, 1d8+2)
 # Dice may also be "exploding" dice, which means that if the maximum value is rolled, the die is rolled again and added to the total
 # Those are represented in the string as "e" (e.g. 2d6e, 3d4e, 1d8e)
-
-
-def parse_dice_string(dice_string):
-    """Parse a dice string into an object { dice: [{ count: int, sides: int, exploding: bool }], modifier: int }"""
-    dice = []
-    modifier = 0
-    # Replace subtraction with addition of negative numbers to simplify parsing
-    dice_string = dice_string.replace("-", "+-")
-    # Split by the + to separate types of dice and modifiers (note that you cannot subtract dice)
-    tokens = dice_string.split("+")
-    for token in tokens:
-        # Check if the token is a die or a modifier
-        if "d" in token:
-            # Split by the d to separate the count and sides of the die
-            count, sides = token.split("d")
-            # Check if the die is exploding
-            exploding = False
-            if "e" in sides:
-                sides = sides[:-1]
-                exploding = True
-            dice.append(
-                {"count": int(count), "sides": int(sides), "exploding": exploding}
-            )
-        else:
-            modifier += int(token)
-    return {"dice": dice, "modifier": modifier}
+# A die group may keep only its highest or lowest dice, as "kh" or "kl" and the number kept (e.g. 4d6kh3, 2d20kl1)
+# or be rolled with a wild die, as "w" (e.g. 1d8ew is a d8e and a d6e, keeping the higher of the two)
 
 
 def get_upper_roll_limit(dice_string):
     """Get the maximum possible roll for a given dice string"""
-    if "e" in dice_string:
-        return float("inf")
-    else:
-        parsed_dice = parse_dice_string(dice_string)
-        total = 0
-        for die in parsed_dice["dice"]:
-            total += die["count"] * die["sides"]
-        total += parsed_dice["modifier"]
-        return total
+    return compile_dice_string(dice_string).maximum
 
 
 def get_lower_roll_limit(dice_string):
     """Get the minimum possible roll for a given dice string"""
-    parsed_dice = parse_dice_string(dice_string)
-    total = 0
-    for die in parsed_dice["dice"]:
-        total += die["count"]
-    total += parsed_dice["modifier"]
-    return total
+    return compile_dice_string(dice_string).minimum
 
 
 def roll_dice(dice_string):
     """Roll dice based on a dice string and return the total and the rolls"""
-    parsed_dice = parse_dice_string(dice_string)
-    rolls = []
+    return compile_dice_string(dice_string).roll()
+
+
+def roll_dice_batch(dice_string, count, rng=None, stats=None):
+    """Roll dice based on a dice string `count` times at once using NumPy
+    Returns an array of `count` totals and the number of dice that exploded across all trials
+    If a SimulationStats is given, the dice rolled and explosions per depth are counted in it
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    expression = compile_dice_string(dice_string)
+    totals = np.full(count, expression.modifier, dtype=np.int64)
+    explosions = 0
+    for group, (die_count, sides, exploding) in enumerate(
+        zip(expression.counts, expression.sides, expression.exploding)
+    ):
+        if expression.keep[group]:
+            # Every die of the group is rolled, then each trial's dice are sorted to pick out the kept ones
+            die_totals = []
+            for group_count, group_sides, group_exploding in expression.group_dice(
+                group
+            ):
+                for _ in range(group_count):
+                    die_total, die_explosions = _roll_die_batch(
+                        group_sides, group_exploding, count, rng, stats
+                    )
+                    die_totals.append(die_total)
+                    explosions += die_explosions
+            totals += _kept_totals_batch(expression, group, die_totals)
+            continue
+        for _ in range(die_count):
+            die_total, die_explosions = _roll_die_batch(
+                sides, exploding, count, rng, stats
+            )
+            totals += die_total
+            explosions += die_explosions
+    return totals, explosions
+
+
+def _roll_die_batch(sides, exploding, count, rng, stats=None):
+    # Roll one die `count` times, returning the totals and the number of trials where it exploded
+    totals = rng.integers(1, sides + 1, size=count)
+    if stats is not None:
+        stats.record_rolls(count)
+    if not exploding:
+        return totals, 0
+    # Only the trials (lanes) that rolled the maximum are rolled again, until none are left
+    lanes = np.flatnonzero(totals == sides)
+    explosions = lanes.size
+    depth = 0
+    while lanes.size:
+        if stats is not None:
+            stats.record_explosions(depth, lanes.size)
+            stats.record_rolls(lanes.size)
+        rolls = rng.integers(1, sides + 1, size=lanes.size)
+        # Lanes are unique, so fancy-indexed addition is safe here
+        totals[lanes] += rolls
+        lanes = lanes[rolls == sides]
+        depth += 1
+    return totals, explosions
+
+
+def _kept_totals_batch(expression, group, die_totals):
+    # Add up the dice a die group keeps in each trial, given a list of each die's totals
+    die_totals = np.sort(np.column_stack(die_totals), axis=1)
+    keep = expression.keep[group]
+    if expression.keep_lowest[group]:
+        return die_totals[:, :keep].sum(axis=1)
+    return die_totals[:, -keep:].sum(axis=1)
+
+
+def _phase(stats, name):
+    # Time a phase only when profiling
+    return stats.phase(name) if stats is not None else nullcontext()
+
+
+def count_successes(dice_string, target_number, steps, rng=None, stats=None):
+    """Roll dice based on a dice string `steps` times and count the rolls at or above a target number
+    If a SimulationStats is given, the trials, dice rolled, explosions and the time spent rolling
+    and aggregating are recorded in it (without NumPy there is no separate aggregation to time)
+    """
+    if stats is not None:
+        stats.trials += steps
+    if np is None:
+        expression = compile_dice_string(dice_string)
+        rng = rng or random
+        successes = 0
+        with _phase(stats, "roll"):
+            for _ in range(steps):
+                if expression.roll_total(rng, stats) >= target_number:
+                    successes += 1
+        return successes
+    successes = 0
+    # Roll in batches to keep memory bounded for very large step counts
+    while steps > 0:
+        batch_size = min(steps, SIMULATION_BATCH_SIZE)
+        with _phase(stats, "roll"):
+            totals, _ = roll_dice_batch(dice_string, batch_size, rng, stats)
+        with _phase(stats, "aggregate"):
+            successes += int(np.count_nonzero(totals >= target_number))
+        steps -= batch_size
+    return successes
+
+
+def sum_rolls(dice_string, steps, rng=None, stats=None):
+    """Roll dice based on a dice string `steps` times and return the sum of the totals and the number of explosions
+    If a SimulationStats is given, it is filled in as in count_successes"""
+    if stats is not None:
+        stats.trials += steps
+    if np is None:
+        expression = compile_dice_string(dice_string)
+        rng = rng or random
+        total = 0
+        explosions = 0
+        with _phase(stats, "roll"):
+            for _ in range(steps):
+                result = expression.roll(rng, stats)
+                total += result[0]
+                for roll in result[1]:
+                    if type(roll) == list:
+                        explosions += 1
+        return total, explosions
     total = 0
-    for die in parsed_dice["dice"]:
-        for _ in range(die["count"]):
-            roll = random.randint(1, die["sides"])
-            total += roll
-            unit_rolls = []
-            unit_rolls.append(
-                ("d" + str(die["sides"]) + ("e" if die["exploding"] else ""), roll)
+    explosions = 0
+    while steps > 0:
+        batch_size = min(steps, SIMULATION_BATCH_SIZE)
+        with _phase(stats, "roll"):
+            totals, batch_explosions = roll_dice_batch(
+                dice_string, batch_size, rng, stats
             )
-            while die["exploding"] and roll == die["sides"]:
-                roll = random.randint(1, die["sides"])
-                total += roll
-                unit_rolls.append(
-                    ("d" + str(die["sides"]) + ("e" if die["exploding"] else ""), roll)
-                )
-            if len(unit_rolls) > 1:
-                rolls.append(unit_rolls)
+        with _phase(stats, "aggregate"):
+            total += int(totals.sum())
+        explosions += batch_explosions
+        steps -= batch_size
+    return total, explosions
+
+
+def new_simulation_seed():
+    """Draw a fresh seed for a simulation that was not given one"""
+    return secrets.randbits(64)
+
+
+def chunk_rng(seed, chunk_index):
+    """Create the random generator for one chunk of a simulation
+    It depends only on the seed and the chunk's position, never on which worker runs the chunk
+    """
+    if np is not None:
+        return np.random.default_rng(
+            np.random.SeedSequence(seed, spawn_key=(chunk_index,))
+        )
+    return random.Random(f"{seed}:{chunk_index}")
+
+
+# Chunk functions return their result along with a SimulationStats when profiling (None otherwise),
+# as chunks may run in other processes
+def _count_successes_chunk(
+    dice_string, target_number, profile, steps, seed, chunk_index
+):
+    stats = SimulationStats() if profile else None
+    successes = count_successes(
+        dice_string, target_number, steps, chunk_rng(seed, chunk_index), stats
+    )
+    return successes, stats
+
+
+def _sum_rolls_chunk(dice_string, profile, steps, seed, chunk_index):
+    stats = SimulationStats() if profile else None
+    return sum_rolls(dice_string, steps, chunk_rng(seed, chunk_index), stats), stats
+
+
+_process_pool = None
+_process_pool_workers = 0
+
+
+def get_process_pool(workers):
+    """Get a process pool with the given number of workers, reusing the previous one when possible"""
+    global _process_pool, _process_pool_workers
+    if _process_pool is None or _process_pool_workers != workers:
+        if _process_pool is not None:
+            _process_pool.shutdown()
+        _process_pool = ProcessPoolExecutor(max_workers=workers)
+        _process_pool_workers = workers
+    return _process_pool
+
+
+def simulate_in_chunks(
+    chunk_function, arguments, steps, seed, workers=1, first_chunk=0
+):
+    """Split `steps` trials into chunks of SIMULATION_CHUNK_SIZE and yield each chunk's result in chunk order
+    Each chunk is run as chunk_function(*arguments, chunk_steps, seed, chunk_index), so results for a seed
+    are the same whatever the number of workers. With more than one worker, chunks run a round at a time on a process pool
+    """
+    chunks = [
+        (first_chunk + index, min(SIMULATION_CHUNK_SIZE, steps - offset))
+        for index, offset in enumerate(range(0, steps, SIMULATION_CHUNK_SIZE))
+    ]
+    if workers <= 1:
+        for chunk_index, chunk_steps in chunks:
+            yield chunk_function(*arguments, chunk_steps, seed, chunk_index)
+        return
+    pool = get_process_pool(workers)
+    for round_start in range(0, len(chunks), workers):
+        futures = [
+            pool.submit(chunk_function, *arguments, chunk_steps, seed, chunk_index)
+            for chunk_index, chunk_steps in chunks[round_start : round_start + workers]
+        ]
+        for future in futures:
+            yield future.result()
+
+
+def confidence_interval(successes, steps, z=SUCCESS_ODDS_CONFIDENCE_Z):
+    """Calculate the Wilson score interval for a success rate (it stays meaningful even with 0 successes)"""
+    rate = successes / steps
+    denominator = 1 + z * z / steps
+    center = (rate + z * z / (2 * steps)) / denominator
+    half_width = (
+        z * math.sqrt(rate * (1 - rate) / steps + z * z / (4 * steps * steps))
+    ) / denominator
+    return max(0.0, center - half_width), min(1.0, center + half_width)
+
+
+def is_far_in_tail(dice_string, target_number):
+    """Check whether a target number is so far above the average roll that plain simulation would rarely reach it"""
+    expression = compile_dice_string(dice_string)
+    # Pools keeping only some of their dice have no precomputed average, and are calculated exactly with NumPy
+    if np is None or not any(expression.exploding) or expression.mean is None:
+        return False
+    spread = expression.mean - expression.minimum
+    return target_number > expression.mean + IMPORTANCE_SAMPLING_TAIL_FACTOR * spread
+
+
+def success_odds_upper_bound(dice_string, target_number):
+    """Bound the odds of success for a given dice string and target number from above without simulating
+    The n dice only reach the target if one of them rolls at least 1/n of what they need
+    (kept dice total no more than all of them), so the odds are at most the sum of each die's odds of that
+    """
+    expression = compile_dice_string(dice_string)
+    dice = [
+        die
+        for group in range(len(expression.counts))
+        for die in expression.group_dice(group)
+    ]
+    number = sum(count for count, _, _ in dice)
+    if number == 0:
+        return 1.0 if target_number <= expression.modifier else 0.0
+    needed = math.ceil((target_number - expression.modifier) / number)
+    return min(
+        1.0,
+        sum(
+            count * precise_odds_single_die(sides, exploding, needed)
+            for count, sides, exploding in dice
+        ),
+    )
+
+
+def biased_explosion_probability(dice_string, target_number):
+    """Find the explosion probability that moves the average roll of a dice string onto a target number
+    Under an explosion probability q an exploding die with n sides explodes q/(1-q) times on average,
+    then rolls one of its other sides (n/2 on average)"""
+    expression = compile_dice_string(dice_string)
+
+    def biased_mean(q):
+        mean = expression.modifier
+        for count, sides, exploding, keep in zip(
+            expression.counts, expression.sides, expression.exploding, expression.keep
+        ):
+            # Only an approximation for groups keeping some of their dice, which is enough to bias them
+            count = keep or count
+            if exploding and sides > 1:
+                mean += count * (sides * q / (1 - q) + sides / 2)
             else:
-                rolls.append(unit_rolls[0])
-    total += parsed_dice["modifier"]
-    return (total, rolls)
+                mean += count * (sides / 2 + 0.5)
+        return mean
 
+    # The biased mean grows with q, so a bisection finds the q that hits the target
+    low, high = 0.0, 1.0 - 1e-9
+    for _ in range(100):
+        middle = (low + high) / 2
+        if biased_mean(middle) < target_number:
+            low = middle
+        else:
+            high = middle
+    return high
 
-def calculate_success_odds(dice_string, target_number):
-    """Calculate the odds of success for a given dice string and target number"""
+
+def roll_dice_batch_biased(
+    dice_string, count, explosion_probability, rng=None, stats=None
+):
+    """Roll dice based on a dice string `count` times with every exploding die exploding at the given probability
+    Returns an array of `count` totals and an array of each trial's log likelihood ratio (true odds over biased odds)
+    If a SimulationStats is given, the dice rolled and (biased) explosions per depth are counted in it
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    expression = compile_dice_string(dice_string)
+    totals = np.full(count, expression.modifier, dtype=np.int64)
+    log_weights = np.zeros(count)
+    q = explosion_probability
+    for group, (die_count, sides, exploding) in enumerate(
+        zip(expression.counts, expression.sides, expression.exploding)
+    ):
+        if expression.keep[group]:
+            # Each die's weight is the same whichever dice end up kept, so every die's weight counts
+            die_totals = []
+            for group_count, group_sides, group_exploding in expression.group_dice(
+                group
+            ):
+                for _ in range(group_count):
+                    if not group_exploding or group_sides < 2:
+                        die_totals.append(rng.integers(1, group_sides + 1, size=count))
+                        if stats is not None:
+                            stats.record_rolls(count)
+                        continue
+                    die_total, die_log_weights = _roll_exploding_die_batch_biased(
+                        group_sides, count, q, rng, stats
+                    )
+                    die_totals.append(die_total)
+                    log_weights += die_log_weights
+            totals += _kept_totals_batch(expression, group, die_totals)
+            continue
+        if not exploding or sides < 2:
+            totals += rng.integers(1, sides + 1, size=(count, die_count)).sum(axis=1)
+            if stats is not None:
+                stats.record_rolls(count * die_count)
+            continue
+        for _ in range(die_count):
+            die_total, die_log_weights = _roll_exploding_die_batch_biased(
+                sides, count, q, rng, stats
+            )
+            totals += die_total
+            log_weights += die_log_weights
+    return totals, log_weights
+
+
+def _roll_exploding_die_batch_biased(sides, count, explosion_probability, rng, stats):
+    # Roll one exploding die `count` times with the given explosion probability,
+    # returning the totals and each trial's log likelihood ratio
+    q = explosion_probability
+    totals = np.zeros(count, dtype=np.int64)
+    log_weights = np.zeros(count)
+    # Exploding costs a factor of (1/n) / q, any other side (1/n) / ((1-q) / (n-1))
+    log_explode = -math.log(sides * q)
+    log_stop = math.log((sides - 1) / (sides * (1 - q)))
+    lanes = np.arange(count)
+    depth = 0
+    while lanes.size:
+        if stats is not None:
+            stats.record_rolls(lanes.size)
+            if depth > 0:
+                stats.record_explosions(depth - 1, lanes.size)
+        explode = rng.random(lanes.size) < q
+        rolls = np.where(explode, sides, rng.integers(1, sides, size=lanes.size))
+        totals[lanes] += rolls
+        log_weights[lanes] += np.where(explode, log_explode, log_stop)
+        lanes = lanes[explode]
+        depth += 1
+    return totals, log_weights
+
+
+def _importance_sample_chunk(
+    dice_string,
+    target_number,
+    explosion_probability,
+    profile,
+    steps,
+    seed,
+    chunk_index,
+):
+    stats = SimulationStats() if profile else None
+    if stats is not None:
+        stats.trials += steps
+    with _phase(stats, "roll"):
+        totals, log_weights = roll_dice_batch_biased(
+            dice_string,
+            steps,
+            explosion_probability,
+            chunk_rng(seed, chunk_index),
+            stats,
+        )
+    with _phase(stats, "aggregate"):
+        # Only successful trials count, each weighted by how much likelier it is without the bias
+        weights = np.where(totals >= target_number, np.exp(log_weights), 0.0)
+        sums = float(weights.sum()), float(np.square(weights).sum())
+    return sums, stats
+
+
+def calculate_success_odds_importance_sampled(
+    dice_string, target_number, workers=1, seed=None, stats=None
+):
+    """Calculate the odds of success for a target number far in the tail of a dice string using importance sampling
+    Exploding dice are made to explode more often, and each trial is reweighted by its likelihood ratio.
+    Stops once the confidence interval is within IMPORTANCE_SAMPLING_RELATIVE_PRECISION of the estimate
+    """
+    expression = compile_dice_string(dice_string)
+    if seed is None:
+        seed = new_simulation_seed()
+    explosion_probability = biased_explosion_probability(expression, target_number)
+    weight_sum = 0.0
+    squared_weight_sum = 0.0
+    steps_taken = 0
+    for (chunk_weight_sum, chunk_squared_weight_sum), chunk_stats in simulate_in_chunks(
+        _importance_sample_chunk,
+        (
+            expression.dice_string,
+            target_number,
+            explosion_probability,
+            stats is not None,
+        ),
+        IMPORTANCE_SAMPLING_MAXIMUM_SIMULATION_STEPS,
+        seed,
+        workers,
+    ):
+        if stats is not None:
+            stats.merge(chunk_stats)
+        weight_sum += chunk_weight_sum
+        squared_weight_sum += chunk_squared_weight_sum
+        steps_taken = min(
+            steps_taken + SIMULATION_CHUNK_SIZE,
+            IMPORTANCE_SAMPLING_MAXIMUM_SIMULATION_STEPS,
+        )
+        odds = weight_sum / steps_taken
+        variance = max(squared_weight_sum / steps_taken - odds * odds, 0.0)
+        half_width = SUCCESS_ODDS_CONFIDENCE_Z * math.sqrt(variance / steps_taken)
+        if odds > 0 and half_width <= IMPORTANCE_SAMPLING_RELATIVE_PRECISION * odds:
+            break
+    return odds, (max(0.0, odds - half_width), min(1.0, odds + half_width))
+
+
+def calculate_success_odds(
+    dice_string,
+    target_number,
+    workers=1,
+    seed=None,
+    precision=SUCCESS_ODDS_DEFAULT_PRECISION,
+    importance_sampling=None,
+    stats=None,
+):
+    """Calculate the odds of success for a given dice string and target number
+    The simulation stops as soon as the confidence interval is within `precision` either side of the estimate
+    (or after SUCCESS_ODDS_MAXIMUM_SIMULATION_STEPS). Returns the odds and the (lower, upper) confidence interval
+    Targets far in the tail are importance sampled instead (to IMPORTANCE_SAMPLING_RELATIVE_PRECISION, when NumPy
+    is available), unless `importance_sampling` says otherwise
+    Pools keeping only some of their dice are calculated exactly instead when NumPy is available (with no interval)
+    If a SimulationStats is given, the simulation is profiled into it
+    """
+    with _phase(stats, "parse"):
+        expression = compile_dice_string(dice_string)
     # Quickly resolve simple edge cases
-    if target_number <= get_lower_roll_limit(dice_string):
-        return 1, False, False
-    if target_number > get_upper_roll_limit(dice_string):
-        return 0, False, False
+    if target_number <= expression.minimum:
+        return 1, (1, 1)
+    if target_number > expression.maximum:
+        return 0, (0, 0)
+    # Keeping some of the dice is handled by the order statistics of the distribution engine, with no simulation,
+    # and targets past the reliable part of its truncated distribution are counted exactly
+    if np is not None and any(expression.keep):
+        odds = reliable_probability_at_least(
+            sum_distribution(expression.dice_string), target_number
+        )
+        if odds is None:
+            odds = float(exact_success_odds(expression, target_number))
+        return odds, (odds, odds)
+    # Rare targets are reached far more often by biasing the explosions
+    if importance_sampling is None:
+        importance_sampling = is_far_in_tail(expression, target_number)
+    # The biased dice are rolled with NumPy, so without it even rare targets are simulated plainly
+    if importance_sampling and np is not None:
+        return calculate_success_odds_importance_sampled(
+            expression, target_number, workers, seed, stats
+        )
     # Otherwise, simulate the dice rolls to calculate the odds
-    total = 0
+    if seed is None:
+        seed = new_simulation_seed()
     successes = 0
     steps_taken = 0
-    # Run the simulation enough to gather a representative sample of successes
-    for _ in range(SUCCESS_ODDS_BASE_SIMULATION_STEPS):
-        result = roll_dice(dice_string)
-        total += result[0]
-        if result[0] >= target_number:
-            successes += 1
-        steps_taken += 1
-    # In cases of very low success rates, run the simulation longer to get a more accurate result
-    # This may still round to 0% if no successes are found within the maximum number of steps
-    for _ in range(
-        SUCCESS_ODDS_MAXIMUM_SIMULATION_STEPS - SUCCESS_ODDS_BASE_SIMULATION_STEPS
+    # Chunks are checked in order, so the stopping point for a seed does not depend on the number of workers
+    for chunk_successes, chunk_stats in simulate_in_chunks(
+        _count_successes_chunk,
+        (expression.dice_string, target_number, stats is not None),
+        SUCCESS_ODDS_MAXIMUM_SIMULATION_STEPS,
+        seed,
+        workers,
     ):
-        if successes > 0:
+        if stats is not None:
+            stats.merge(chunk_stats)
+        successes += chunk_successes
+        steps_taken += SIMULATION_CHUNK_SIZE
+        lower, upper = confidence_interval(successes, steps_taken)
+        if (upper - lower) / 2 <= precision:
             break
-        result = roll_dice(dice_string)
-        total += result[0]
-        if result[0] >= target_number:
-            successes += 1
-        steps_taken += 1
-    odds = successes / steps_taken
-    long_simulation = steps_taken > SUCCESS_ODDS_BASE_SIMULATION_STEPS
-    low_success_rate = successes < 10
-    return odds, long_simulation, low_success_rate
-
-
-def display_dice_average(dice_string):
-    """Display the average roll for a given dice string and the average number of explosions"""
+    # The last chunk may be shorter than the others when the maximum is reached
+    steps_taken = min(steps_taken, SUCCESS_ODDS_MAXIMUM_SIMULATION_STEPS)
+    return successes / steps_taken, confidence_interval(successes, steps_taken)
+
+
+def dice_average(dice_string):
+    """Calculate the average roll for a given dice string without simulating
+    Pools keeping only some of their dice are averaged by the exact engine, as their average needs order statistics
+    """
+    expression = compile_dice_string(dice_string)
+    if expression.mean is None:
+        return float(exact_dice_average(expression))
+    return expression.mean
+
+
+def calculate_dice_average(
+    dice_string, workers=1, seed=None, log_writer=None, stats=None
+):
+    """Calculate the average roll and the average number of explosions for a given dice string
+    If a RollLogWriter is given, every roll is streamed to it (rolling one trial at a time on this process)
+    If a SimulationStats is given, the simulation is profiled into it
+    """
+    with _phase(stats, "parse"):
+        expression = compile_dice_string(dice_string)
+    if seed is None:
+        seed = new_simulation_seed()
     total = 0
-    rolls = []
     explosions = 0
-    for _ in range(DICE_AVERAGES_SIMULATION_STEPS):
-        result = roll_dice(dice_string)
-        total += result[0]
-        rolls.extend(result[1])
-        for roll in result[1]:
-            if type(roll) == list:
-                explosions += 1
-    average = total / DICE_AVERAGES_SIMULATION_STEPS
-    rounded_average = round(average, AVERAGES_PRECISION)
-    rounded_average_explosions = round(
-        explosions / DICE_AVERAGES_SIMULATION_STEPS, AVERAGES_PRECISION
+    if log_writer is not None:
+        rng = random.Random(seed)
+        if stats is not None:
+            stats.trials += DICE_AVERAGES_SIMULATION_STEPS
+        with _phase(stats, "roll"):
+            for _ in range(DICE_AVERAGES_SIMULATION_STEPS):
+                roll_total, rolls = expression.roll(rng, stats)
+                log_writer.write(roll_total, rolls)
+                total += roll_total
+                for roll in rolls:
+                    if type(roll) == list:
+                        explosions += 1
+        return (
+            total / DICE_AVERAGES_SIMULATION_STEPS,
+            explosions / DICE_AVERAGES_SIMULATION_STEPS,
+        )
+    for (chunk_total, chunk_explosions), chunk_stats in simulate_in_chunks(
+        _sum_rolls_chunk,
+        (expression.dice_string, stats is not None),
+        DICE_AVERAGES_SIMULATION_STEPS,
+        seed,
+        workers,
+    ):
+        if stats is not None:
+            stats.merge(chunk_stats)
+        total += chunk_total
+        explosions += chunk_explosions
+    return (
+        total / DICE_AVERAGES_SIMULATION_STEPS,
+        explosions / DICE_AVERAGES_SIMULATION_STEPS,
+    )
+
+
+def cached_success_odds(
+    dice_string,
+    target_number,
+    workers=1,
+    seed=None,
+    precision=SUCCESS_ODDS_DEFAULT_PRECISION,
+    cache=None,
+    stats=None,
+):
+    """Calculate the odds of success like calculate_success_odds, reusing results saved in a ResultCache
+    Seeded or profiled calculations are never cached, so that they stay reproducible and are really run
+    """
+    if cache is None or seed is not None or stats is not None:
+        return calculate_success_odds(
+            dice_string, target_number, workers, seed, precision, stats=stats
+        )
+    if np is not None and any(compile_dice_string(dice_string).keep):
+        method = "exact"
+    elif is_far_in_tail(dice_string, target_number):
+        method = "importance_sampled"
+    else:
+        method = "simulated"
+    # Only plain simulation stops at the requested precision, so the other methods share one entry whatever it is
+    key = ResultCache.make_key(
+        canonical_dice_string(dice_string),
+        target_number,
+        method,
+        precision if method == "simulated" else None,
     )
+    cached = cache.get(key)
+    if cached is not None:
+        odds, lower, upper = cached
+        return odds, (lower, upper)
+    odds, (lower, upper) = calculate_success_odds(
+        dice_string, target_number, workers, seed, precision
+    )
+    cache.put(key, [odds, lower, upper])
+    return odds, (lower, upper)
+
+
+def display_dice_average(
+    dice_string, workers=1, seed=None, cache=None, log_format=None, stats=None
+):
+    """Display the average roll for a given dice string and the average number of explosions
+    Results are looked up in and saved to the given ResultCache, unless a seed is given, rolls are logged
+    or the simulation is profiled into a SimulationStats.
+    With a log format ("ndjson" or "ndjson.gz"), every roll is streamed to a log file named after the dice string
+    """
+    if log_format is not None:
+        # Save a log of the rolls to a file named after the dice string and current timestamp
+        log_path = (
+            dice_string
+            + "_"
+            + datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+            + "."
+            + log_format
+        )
+        with RollLogWriter(log_path) as log_writer:
+            average, average_explosions = calculate_dice_average(
+                dice_string, workers, seed, log_writer, stats
+            )
+        print_dice_average(dice_string, average, average_explosions)
+        print(f"Saved a log of the rolls to {log_path}\n")
+        return
+    key = None
+    cached = None
+    if cache is not None and seed is None and stats is None:
+        key = ResultCache.make_key(
+            canonical_dice_string(dice_string),
+            None,
+            "simulated",
+            DICE_AVERAGES_SIMULATION_STEPS,
+        )
+        cached = cache.get(key)
+    if cached is not None:
+        average, average_explosions = cached
+    else:
+        average, average_explosions = calculate_dice_average(
+            dice_string, workers, seed, stats=stats
+        )
+        if key is not None:
+            cache.put(key, [average, average_explosions])
+    print_dice_average(dice_string, average, average_explosions)
+    print()
+
+
+def print_dice_average(dice_string, average, average_explosions):
+    """Print an average roll and average number of explosions for a dice string"""
+    rounded_average = round(average, AVERAGES_PRECISION)
+    rounded_average_explosions = round(average_explosions, AVERAGES_PRECISION)
     print("Average roll for " + dice_string + ": " + str(rounded_average))
     print(
         "Average number of explosions for "
@@ -151,27 +722,175 @@ def display_dice_average(dice_string):
         + ": "
         + str(rounded_average_explosions)
     )
-    print()
-    # Save a log of the rolls to a JSON file named after the dice string and current timestamp
-    # with open(dice_string + "_" + datetime.datetime.now().strftime("%Y%m%d%H%M%S") + ".json", "w") as file:
-    #     json.dump(rolls, file, indent=4)
 
 
-def display_success_odds(dice_string, target_number):
-    """Display the odds of success for a given dice string and target number"""
+def _histogram_chunk(dice_string, steps, seed, chunk_index):
+    """Count how often each total (relative to the minimum roll) comes up in one chunk of a simulation"""
+    expression = compile_dice_string(dice_string)
+    rng = chunk_rng(seed, chunk_index)
+    if np is None:
+        counts = []
+        for _ in range(steps):
+            index = expression.roll_total(rng) - expression.minimum
+            if index >= len(counts):
+                counts.extend([0] * (index + 1 - len(counts)))
+            counts[index] += 1
+        return counts
+    counts = []
+    while steps > 0:
+        batch_size = min(steps, SIMULATION_BATCH_SIZE)
+        totals, _ = roll_dice_batch(expression, batch_size, rng)
+        counts = _add_counts(counts, np.bincount(totals - expression.minimum).tolist())
+        steps -= batch_size
+    return counts
+
+
+def _add_counts(a, b):
+    if len(a) < len(b):
+        a, b = b, a
+    return [
+        count + (b[index] if index < len(b) else 0) for index, count in enumerate(a)
+    ]
+
+
+def default_survival_table_method():
+    """Survival tables are exact when NumPy is available, and simulated otherwise"""
+    return "exact" if np is not None else "simulated"
+
+
+def calculate_survival_table(
+    dice_string,
+    method=None,
+    tail_cutoff=TABLE_TAIL_CUTOFF,
+    workers=1,
+    seed=None,
+):
+    """Calculate the odds of success for every target number of a dice string in a single pass
+    The method is "exact" (convolving the dice's distributions, needs NumPy) or "simulated" (one histogram
+    of TABLE_SIMULATION_STEPS rolls); it defaults to "exact" when NumPy is available. Returns {
+        "dice_string": str,
+        "method": str,
+        "minimum": int (the lowest possible roll),
+        "survival": [float, ...] (index i holds the odds of rolling minimum + i or more),
+        "steps": int or None (the number of simulated rolls, None for exact tables)
+    }"""
+    expression = compile_dice_string(dice_string)
+    if method is None:
+        method = default_survival_table_method()
+    if method == "exact":
+        if np is None:
+            raise ValueError("Exact survival tables need NumPy")
+        distribution = sum_distribution(expression.dice_string)
+        # Odds past the reliable part of the distribution are left to be counted exactly (see table_success_odds)
+        survival = distribution["survival"][: distribution["reliable"]].tolist()
+        minimum = distribution["offset"]
+        steps = None
+    elif method == "simulated":
+        if seed is None:
+            seed = new_simulation_seed()
+        counts = []
+        for chunk_counts in simulate_in_chunks(
+            _histogram_chunk,
+            (expression.dice_string,),
+            TABLE_SIMULATION_STEPS,
+            seed,
+            workers,
+        ):
+            counts = _add_counts(counts, chunk_counts)
+        # Survival is the running total of the counts from the highest roll down
+        survival = []
+        remaining = TABLE_SIMULATION_STEPS
+        for count in counts:
+            survival.append(remaining / TABLE_SIMULATION_STEPS)
+            remaining -= count
+        minimum = expression.minimum
+        steps = TABLE_SIMULATION_STEPS
+    else:
+        raise ValueError(f"Unknown survival table method: {method}")
+    # Cut the table off where the odds become negligible
+    length = len(survival)
+    while length > 1 and survival[length - 1] < tail_cutoff:
+        length -= 1
+    return {
+        "dice_string": expression.dice_string,
+        "method": method,
+        "minimum": minimum,
+        "survival": survival[:length],
+        "steps": steps,
+    }
+
+
+def table_success_odds(survival_table, target_number):
+    """Look up the odds of success for a target number in a survival table
+    Returns None when the target number is beyond the end of the table"""
+    index = target_number - survival_table["minimum"]
+    if index <= 0:
+        return 1
+    if index >= len(survival_table["survival"]):
+        return None
+    return survival_table["survival"][index]
+
+
+def export_survival_table(survival_table, path):
+    """Save a survival table to a CSV or JSON file (chosen by the file extension)"""
+    rows = [
+        (survival_table["minimum"] + index, odds)
+        for index, odds in enumerate(survival_table["survival"])
+    ]
+    with open(path, "w", newline="") as file:
+        if path.lower().endswith(".json"):
+            json.dump(
+                {
+                    "dice_string": survival_table["dice_string"],
+                    "method": survival_table["method"],
+                    "steps": survival_table["steps"],
+                    "odds": [{"target": target, "odds": odds} for target, odds in rows],
+                },
+                file,
+                indent=4,
+            )
+        else:
+            writer = csv.writer(file)
+            writer.writerow(["target", "odds"])
+            writer.writerows(rows)
+
+
+def display_success_odds(
+    dice_string,
+    target_number,
+    workers=1,
+    seed=None,
+    precision=SUCCESS_ODDS_DEFAULT_PRECISION,
+    survival_table=None,
+    cache=None,
+    stats=None,
+):
+    """Display the odds of success for a given dice string and target number
+    If a survival table for the dice string is given, the odds are looked up in it when it covers the target
+    Otherwise they are looked up in and saved to the given ResultCache, unless a seed is given
+    or the simulation is profiled into a SimulationStats
+    """
     print(f"Calculating odds for {dice_string} vs {target_number}...")
-    odds, long_simulation, low_success_rate = calculate_success_odds(
-        dice_string, target_number
-    )
-    # Print warnings if simulation data is not sufficient
-    if long_simulation:
-        print(
-            f"WARNING: Simulation required more than {SUCCESS_ODDS_BASE_SIMULATION_STEPS} steps to produce a successful roll. Results may be inaccurate."
+    odds = None
+    if survival_table is not None:
+        odds = table_success_odds(survival_table, target_number)
+    if odds is None:
+        odds, (lower, upper) = cached_success_odds(
+            dice_string, target_number, workers, seed, precision, cache, stats
+        )
+    elif survival_table["steps"] is None:
+        lower, upper = odds, odds
+    else:
+        lower, upper = confidence_interval(
+            round(odds * survival_table["steps"]), survival_table["steps"]
         )
-    if low_success_rate:
-        print(f"WARNING: Very low success rates may not be accurate or consistent.")
     percentage = round(odds * 100, PERCENTAGES_PRECISION)
     print(f"{dice_string} TN {target_number}: {percentage}% chance of success")
+    # Show how far off the simulated percentage could be (exact odds have no interval to show)
+    if lower != upper:
+        lower_percentage = round(lower * 100, PERCENTAGES_PRECISION)
+        upper_percentage = round(upper * 100, PERCENTAGES_PRECISION)
+        print(f"95% confidence interval: {lower_percentage}% to {upper_percentage}%")
     # Also print in 1 in X format for easier understanding
     if odds == 0:
         print(f"1 in ∞ chance of success\n")
@@ -179,7 +898,50 @@ def display_success_odds(dice_string, target_number):
         print(f"1 in {round(1 / odds)} chance of success\n")
 
 
-def menu_loop():
+def display_survival_table(
+    dice_string, method=None, output_path=None, workers=1, seed=None
+):
+    """Display the odds of success for every target number of a dice string, optionally saving them to a file
+    Returns the survival table so that later target queries can be looked up in it"""
+    print(f"Calculating odds table for {dice_string}...")
+    survival_table = calculate_survival_table(
+        dice_string, method, workers=workers, seed=seed
+    )
+    for index, odds in enumerate(survival_table["survival"]):
+        percentage = round(odds * 100, PERCENTAGES_PRECISION)
+        print(f"TN {survival_table['minimum'] + index}: {percentage}%")
+    if output_path is not None:
+        export_survival_table(survival_table, output_path)
+        print(f"Saved odds table to {output_path}")
+    print()
+    return survival_table
+
+
+def display_exact_success_odds(dice_string, target_number):
+    """Display the exact odds of success for a given dice string and target number, as a fraction"""
+    odds = exact_success_odds(dice_string, target_number)
+    percentage = round(float(odds) * 100, PERCENTAGES_PRECISION)
+    print(
+        f"{dice_string} TN {target_number}: exactly {odds} ({percentage}%) chance of success\n"
+    )
+
+
+def display_exact_dice_average(dice_string):
+    """Display the exact average roll for a given dice string, as a fraction"""
+    average = exact_dice_average(dice_string)
+    print(
+        f"{dice_string} average: exactly {average} ({round(float(average), AVERAGES_PRECISION)})\n"
+    )
+
+
+def menu_loop(
+    workers=1,
+    seed=None,
+    precision=SUCCESS_ODDS_DEFAULT_PRECISION,
+    method=None,
+    cache=None,
+    log_format=None,
+):
     print("****************************")
     print("* EXPLODING DICE SIMULATOR *")
     print("****************************\n")
@@ -187,47 +949,66 @@ def menu_loop():
         "Enter dice strings like 'NdM', 'NdM±X', or 'NdMe±X', where N is the number of dice, M is the sides, 'e' indicates an exploding die, and X is a modifier."
     )
     print(
-        "The simulator calculates the average roll, number of explosions, and logs all rolls.\n"
+        "Add 'khK' or 'klK' to keep only the K highest or lowest dice (e.g. '4d6kh3'), or 'w' to roll with a wild d6e and keep the highest (e.g. '1d8ew')."
+    )
+    print(
+        "The simulator calculates the average roll, number of explosions, and logs all rolls when started with --log.\n"
     )
     print(
         "Calculate the odds of success vs a target number by entering 'target T NdMe±X' where T is the target number.\n"
     )
+    print(
+        "Calculate the odds for every target number at once by entering 'table NdMe±X', optionally followed by a .csv or .json file to save it to.\n"
+    )
     print("To exit, enter 'exit'.\n")
+    # Survival tables computed so far, so that target queries against the same dice are looked up
+    survival_tables = {}
     while True:
         dice_string = input("> ")
         print()
         if dice_string == "exit":
             break
+        elif dice_string.startswith("table "):
+            _, dice_string, *output_path = dice_string.split(" ")
+            survival_table = display_survival_table(
+                dice_string,
+                method,
+                output_path[0] if output_path else None,
+                workers,
+                seed,
+            )
+            survival_tables[survival_table["dice_string"]] = survival_table
         elif "target" in dice_string:
             _, target, dice_string = dice_string.split(" ")
-            display_success_odds(dice_string, int(target))
+            display_success_odds(
+                dice_string,
+                int(target),
+                workers,
+                seed,
+                precision,
+                survival_tables.get(compile_dice_string(dice_string).dice_string),
+                cache,
+            )
         else:
-            display_dice_average(dice_string)
+            display_dice_average(dice_string, workers, seed, cache, log_format)
 
 
-if __name__ == "__main__":
-    """Main function to run the dice simulator program"""
-    if len(sys.argv) > 1:
-        if sys.argv[1] == "target" and len(sys.argv) == 4:
-            target = int(sys.argv[2])
-            dice_string = sys.argv[3]
-            display_success_odds(dice_string, target)
-        else:
-            for dice_string in sys.argv[1:]:
-                display_dice_average(dice_string)
-    else:
-        menu_loop()
-
 """ ALTERNATIVE PRECISE MATHEMATICAL CALCULATIONS (IN PROGRESS, I'M BAD AT MATH) """
-from functools import reduce
+from fractions import Fraction
 
 
-def precise_odds_exploding_die(num_sides, target_number):
+def precise_odds_exploding_die(num_sides, target_number, exact=False):
     """Calculate the odds of an exploding die rolling at or above a target number
     p = ((1/n) ^ floor((t-1) / n)) * (1 - (( (t-1) % n ) / n))
     p = probability of rolling at or above the target number
     n = number of sides on the die
-    t = target number"""
+    t = target number
+    If exact is True the odds are returned as a Fraction instead of a float"""
+    if exact:
+        return exact_odds_exploding_die(num_sides, target_number)
+    # Standard dice are looked up in the precomputed tables when NumPy is available
+    if exploding_die_survival is not None:
+        return exploding_die_survival(num_sides, target_number)
     n = float(num_sides)
     t = float(target_number)
     one_over_n = 1.0 / n  # 1/n
@@ -243,14 +1024,19 @@ def precise_odds_exploding_die(num_sides, target_number):
 # print(f"d6,t=18: {precise_odds_exploding_die(6, 18)}")
 
 
-def precise_odds_of_alternatives(probabilities):
-    """Calculate the odds of any of a set of probabilities occurring"""
-    # invert each of the probabilities to get the odds they won't occur
-    inverse_probabilities = [1 - p for p in probabilities]
+def precise_odds_of_alternatives(probabilities, exact=False):
+    """Calculate the odds of any of a set of probabilities occurring
+    If exact is True the odds are calculated (and returned) as a Fraction instead of a float
+    """
+    if exact:
+        return exact_odds_of_alternatives(probabilities)
+    if any(p >= 1 for p in probabilities):
+        return 1.0
     # combine the odds of each not occurring to get the odds of none occurring
-    odds_of_all_failures = reduce(lambda x, y: x * y, inverse_probabilities)
+    # (as a sum of logs, since 1 - p rounds tiny probabilities away entirely)
+    log_odds_of_all_failures = sum(math.log1p(-p) for p in probabilities)
     # invert the odds of none occurring to get the odds of at least one occurring
-    return 1 - odds_of_all_failures
+    return -math.expm1(log_odds_of_all_failures)
 
 
 def precise_odds_any_exploding_dice(dice_size_list, target_number):
@@ -280,6 +1066,60 @@ def precise_average_exploding_die(num_sides):
 # print(f"avg d6: {precise_average_exploding_die(6)}")
 
 
+def precise_odds_single_die(num_sides, exploding, target_number, exact=False):
+    """Calculate the odds of a single (possibly exploding) die rolling at or above a target number"""
+    if target_number <= 1:
+        return Fraction(1) if exact else 1.0
+    if exploding:
+        return precise_odds_exploding_die(num_sides, target_number, exact)
+    if target_number <= num_sides:
+        if exact:
+            return Fraction(num_sides - target_number + 1, num_sides)
+        return (num_sides - target_number + 1) / num_sides
+    return Fraction(0) if exact else 0.0
+
+
+def precise_odds_dice_string(dice_string, target_number, exact=False):
+    """Calculate the odds of a dice string rolling at or above a target number without simulating
+    A single die uses the closed form, larger pools convolve their dice's (truncated) distributions
+    (or, without NumPy or in their far tail, are counted exactly)
+    If exact is True the odds are calculated with integers alone and returned as a Fraction
+    """
+    if exact:
+        return exact_success_odds(dice_string, target_number)
+    expression = compile_dice_string(dice_string)
+    # Get the effective target number by subtracting the modifier
+    effective_target = target_number - expression.modifier
+    if sum(expression.counts) == 0:
+        return 1.0 if effective_target <= 0 else 0.0
+    if sum(expression.counts) == 1 and not any(expression.wild):
+        # Groups of no dice may come before the one die
+        group = next(group for group, count in enumerate(expression.counts) if count)
+        return precise_odds_single_die(
+            expression.sides[group], expression.exploding[group], effective_target
+        )
+    # Without NumPy to convolve their distributions, larger pools are counted exactly with integers instead,
+    # as are targets past the reliable part of the truncated distribution
+    if np is not None:
+        odds = reliable_probability_at_least(
+            sum_distribution(expression.dice_string), target_number
+        )
+        if odds is not None:
+            return odds
+    return float(exact_success_odds(expression, target_number))
+
+
+def precise_odds_any_alternative(alternative_dice_strings, target_number, exact=False):
+    """Calculate the odds of any of a set of dice strings (each rolled separately) reaching a target number"""
+    return precise_odds_of_alternatives(
+        [
+            precise_odds_dice_string(dice_string, target_number, exact)
+            for dice_string in alternative_dice_strings
+        ],
+        exact,
+    )
+
+
 # New Menu Loop
 def new_menu_loop():
     print("new menu test")
@@ -295,39 +1135,14 @@ def new_menu_loop():
             dice_string, target = dice_string.split(" target ")
             # Alternative dice (dice that aren't added but any of them can be used to reach the target number) are separated by spaces
             alternative_dice_strings = dice_string.split(" ")
-            # An array to store probabilities of each alternative
-            probabilities = []
-            # Each alternative is handled based on its properties after being parsed
-            for dice_string in alternative_dice_strings:
-                # Parse the dice string
-                parsed_dice_string = parse_dice_string(dice_string)
-                # Get the effective target number by subtracting the modifier
-                effective_target = int(target) - parsed_dice_string["modifier"]
-                # Check if there are multiple dice being added together, which requires simulation
-                if len(parsed_dice_string["dice"]) > 1:
-                    # Simulation-based solution required, todo
-                    pass
-                else:
-                    # A single die can be calculated precisely
-                    exploding = parsed_dice_string["dice"][0]["exploding"]
-                    num_sides = parsed_dice_string["dice"][0]["sides"]
-                    if exploding:
-                        # Calculate the odds of an exploding die reaching the target number
-                        probabilities.append(
-                            precise_odds_exploding_die(num_sides, effective_target)
-                        )
-                    else:
-                        # Calculate the odds of a regular die reaching the target number
-                        if effective_target <= num_sides:
-                            probabilities.append(
-                                (num_sides - effective_target + 1) / num_sides
-                            )
-                        else:
-                            probabilities.append(0.0)
             # Calculate the odds of any of the alternatives reaching the target number
-            odds = precise_odds_of_alternatives(probabilities)
+            odds = precise_odds_any_alternative(alternative_dice_strings, int(target))
             # Print the result
             print(f"Odds: {odds}")
 
 
-new_menu_loop()
+if __name__ == "__main__":
+    # The command line options (queries, batches, tables, profiling...) are handled by ExplodingDiceCLI
+    if len(sys.argv) > 1:
+        sys.exit("Run ExplodingDiceCLI.py to pass command line options")
+    menu_loop()
@@ -0,0 +1,136 @@
+import os
+from functools import lru_cache
+
+import numpy as np
+
+# Die sizes with precomputed tables; other sizes fall back to the closed forms
+STANDARD_DIE_SIZES = (4, 6, 8, 10, 12, 20)
+# Tables cover totals reachable with up to this many explosions in a row
+TABLE_MAX_EXPLOSIONS = 24
+TABLE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+PMF_ROW = 0
+SURVIVAL_ROW = 1
+
+
+def tables_path(max_explosions=TABLE_MAX_EXPLOSIONS):
+    """The file the tables for a given depth are stored in."""
+    return os.path.join(TABLE_DIRECTORY, f"exploding_die_tables_{max_explosions}.npy")
+
+
+def build_tables(max_explosions=TABLE_MAX_EXPLOSIONS):
+    """
+    Build the tables of every standard die size.
+    :return: An array where [i, PMF_ROW, v] is the probability of die STANDARD_DIE_SIZES[i] totalling v,
+        and [i, SURVIVAL_ROW, v] the probability of it totalling v or more.
+    """
+    length = (max_explosions + 1) * max(STANDARD_DIE_SIZES)
+    tables = np.zeros((len(STANDARD_DIE_SIZES), 2, length))
+    for index, sides in enumerate(STANDARD_DIE_SIZES):
+        # A total of k * sides + r (with 1 <= r < sides) needs k explosions followed by r
+        for k in range(max_explosions + 1):
+            tables[index, PMF_ROW, k * sides + 1 : (k + 1) * sides] = (1 / sides) ** (
+                k + 1
+            )
+        # Survival comes from the closed form, so it stays exact beyond the truncated tail of the PMF
+        for total in range((max_explosions + 1) * sides):
+            tables[index, SURVIVAL_ROW, total] = closed_form_survival(sides, total)
+    return tables
+
+
+def generate_tables(max_explosions=TABLE_MAX_EXPLOSIONS):
+    """Build the tables and save them to their file, returning the path."""
+    path = tables_path(max_explosions)
+    # Written to a temporary file first so that a reader never maps a half-written table
+    temporary_path = path + f".{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as file:
+        np.save(file, build_tables(max_explosions))
+    os.replace(temporary_path, path)
+    return path
+
+
+@lru_cache(maxsize=None)
+def load_tables(max_explosions=TABLE_MAX_EXPLOSIONS):
+    """Memory-map the tables from their file, generating it the first time (or building them in memory if it cannot be written)."""
+    path = tables_path(max_explosions)
+    if not os.path.exists(path):
+        try:
+            generate_tables(max_explosions)
+        except OSError:
+            tables = build_tables(max_explosions)
+            tables.flags.writeable = False
+            return tables
+    # A plain ndarray view of the mapped file indexes much faster than the memmap subclass
+    return np.asarray(np.load(path, mmap_mode="r"))
+
+
+# Survival rows of the default-depth tables by die size, filled in on first use
+_survival_rows = {}
+
+
+def _survival_row(sides, max_explosions):
+    return load_tables(max_explosions)[
+        STANDARD_DIE_SIZES.index(sides), SURVIVAL_ROW, : (max_explosions + 1) * sides
+    ]
+
+
+def closed_form_survival(sides, target_number):
+    """
+    The probability of an exploding die totalling the target number or more.
+    p = ((1/n) ^ floor((t-1) / n)) * (1 - (((t-1) % n) / n))
+    """
+    if target_number <= 1:
+        return 1.0
+    explosions, remainder = divmod(target_number - 1, sides)
+    return (1 / sides) ** explosions * (1 - remainder / sides)
+
+
+def exploding_die_pmf_table(sides, max_explosions=TABLE_MAX_EXPLOSIONS):
+    """
+    The read-only probability mass function of a standard exploding die, straight from the tables.
+    :return: An array where index v holds the probability of the die totalling v.
+    """
+    index = STANDARD_DIE_SIZES.index(sides)
+    return load_tables(max_explosions)[index, PMF_ROW, : (max_explosions + 1) * sides]
+
+
+def exploding_die_survival(sides, target_number, max_explosions=TABLE_MAX_EXPLOSIONS):
+    """
+    The probability of an exploding die totalling the target number or more.
+    Whole target numbers (int or float) within the tables are looked up, any other uses the closed form.
+    """
+    if max_explosions == TABLE_MAX_EXPLOSIONS:
+        row = _survival_rows.get(sides)
+        if row is None and sides in STANDARD_DIE_SIZES:
+            row = _survival_rows[sides] = _survival_row(sides, max_explosions)
+    elif sides in STANDARD_DIE_SIZES:
+        row = _survival_row(sides, max_explosions)
+    else:
+        row = None
+    if row is not None and 0 <= target_number < len(row):
+        if type(target_number) is int:
+            return row.item(target_number)
+        if float(target_number).is_integer():
+            return row.item(int(target_number))
+    return closed_form_survival(sides, target_number)
+
+
+@lru_cache(maxsize=None)
+def exploding_die_moments(sides):
+    """
+    The mean and variance of an exploding die.
+    Its total is sides * K + R, where the number of explosions K is geometric with p = 1/sides
+    and the final roll R is uniform over 1 to sides - 1.
+    :return: (mean, variance)
+    """
+    p = 1 / sides
+    mean = sides * p / (1 - p) + sides / 2
+    variance = sides * sides * p / (1 - p) ** 2 + ((sides - 1) ** 2 - 1) / 12
+    return mean, variance
+
+
+# Regenerate the table file when this file is executed as the main module
+if __name__ == "__main__":
+    print(f"Saved exploding die tables to {generate_tables()}")
+    for sides in STANDARD_DIE_SIZES:
+        mean, variance = exploding_die_moments(sides)
+        print(f"d{sides}e: mean {mean:.4f}, variance {variance:.4f}")
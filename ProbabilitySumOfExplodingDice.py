@@ -1,101 +1,62 @@
-def probability_sum_of_exploding_dice(dice: list[int], target: int) -> float:
-    """Return the probability of the sum of exploding dice beating a target number."""
+import math
+from typing import Iterator
 
-    # region Helper Functions
-    def all_dice_combos(dice):
-        """
-        This function is a generator that returns all possible combinations of dice rolls.
-        dice: [int, ...] (int is the number of sides on the die)
-        returns: [(int, int), ...] (each tuple is a die and the result of the roll)
-        """
-        if len(dice) == 0:
-            return [[]]
-        die = dice[0]
-        dice = dice[1:]
-        return [
-            ((die, i), *combo)
-            for i in range(1, die + 1)
-            for combo in all_dice_combos(dice)
-        ]
 
-    def find_successful_results(previous_result):
-        """
-        Recursively find all results of exploding dice which beat a target number (also calculates probability per result)
-        previous_result: {
-            "target": int (the value to beat),
-            "probability": float (the probability of this result occurring),
-            "total": int (the sum of all dice in this result),
-            "state": [(int, int), ...] (each tuple is a die and the result of the roll),
-            "history": [{...}, ...] (each object is a previous result's state without history, target, or probability)
-        }
-        """
-        # For history storing purposes, create a copy of the previous result that does not itself contain history
-        # It also does not need target or probability, as those are only relevant to the final results
-        historical_result = {
-            key: value
-            for key, value in previous_result.items()
-            if key != "history" and key != "target" and key != "probability"
-        }
-        # Do not include the very "first" roll result in the history, as that is actually a configuration/setup
-        # We can easily identify the configuration results because its total will be 0
-        if previous_result["total"] == 0:
-            history = []
-        else:
-            history = previous_result["history"] + [historical_result]
-        # Any dice that exploded in the previous iteration must be rolled again
-        remaining_dice = [
-            die for die, result in previous_result["state"] if result == die
-        ]
-        # Base case: no dice exploded in the previous iteration, no remaining dice to roll
-        if len(remaining_dice) == 0:
-            return []
-        # Get all possible combinations of the remaining dice
-        remaining_combinations = all_dice_combos(remaining_dice)
-        # Get the odds of rolling each combination in this iteration
-        chance_to_roll = 1 / len(remaining_combinations)
-        # Create a results over the target value
-        results_beating_target = []
-        # Create a RollResult for each combination and determine if recursion should occur
-        for combination in remaining_combinations:
-            roll_result = {
-                "target": previous_result["target"],
-                "probability": previous_result["probability"] * chance_to_roll,
-                "total": previous_result["total"]
-                + sum(result for die, result in combination),
-                "state": combination,
-                "history": history,
-            }
-            # If a result beats the target, add it to the results_beating_target list
-            if roll_result["total"] >= roll_result["target"]:
-                results_beating_target.append(roll_result)
-            # If a result does not beat the target, we will recursively call this function
-            # to determine the odds of reaching the target value
-            else:
-                results_beating_target.extend(find_successful_results(roll_result))
-        return results_beating_target
+def successful_results(
+    dice: list[int], target: int, keep_history: bool = False
+) -> Iterator[dict]:
+    """
+    Generate the ways a set of exploding dice can reach a target number, one at a time (they are all disjoint).
+    Dice are rolled one at a time, an exploding die staying behind to be rolled again, and partial results
+    with the same dice left to roll and the same total are merged by adding up their probabilities.
+    Every roll adds at least 1, so partial results are rolled on in increasing order of their total:
+    each one is complete before it is rolled on, and only the distinct partial results are ever held in memory.
+    dice: [int, ...] (int is the number of sides on the die)
+    target: int (the value to beat)
+    keep_history: bool (whether to record the rolls leading to each result; partial results are then never merged)
+    yields: {
+        "probability": float (the probability of this result occurring),
+        "total": int (the sum of all dice in this result),
+        "history": ((int, int), ...) or None (each tuple is a die and the result of the roll)
+    }
+    """
+    if target <= 0:
+        yield {"probability": 1.0, "total": 0, "history": () if keep_history else None}
+        return
+    if not dice:
+        return
+    # pending[total] maps (dice left to roll, history) to the probability of that partial result
+    pending = {0: {(tuple(dice), () if keep_history else None): 1.0}}
+    for total in range(target):
+        for (remaining, history), probability in pending.pop(total, {}).items():
+            die = remaining[0]
+            chance_to_roll = probability / die
+            for result in range(1, die + 1):
+                # An exploding die stays to be rolled again
+                next_remaining = remaining if result == die else remaining[1:]
+                next_total = total + result
+                next_history = (
+                    history + ((die, result),) if history is not None else None
+                )
+                if next_total >= target:
+                    yield {
+                        "probability": chance_to_roll,
+                        "total": next_total,
+                        "history": next_history,
+                    }
+                # Partial results with no dice left to roll have missed the target
+                elif next_remaining:
+                    states = pending.setdefault(next_total, {})
+                    key = (next_remaining, next_history)
+                    states[key] = states.get(key, 0.0) + chance_to_roll
 
-    # endregion
 
-    # region Calculation
-    # Get a list of all results which beat the target number (objects in list include probability per result)
-    results = find_successful_results(
-        {
-            "target": target,
-            "probability": 1,
-            "total": 0,
-            "state": [(i, i) for i in dice],
-            "history": [],
-        }
+def probability_sum_of_exploding_dice(dice: list[int], target: int) -> float:
+    """Return the probability of the sum of exploding dice beating a target number."""
+    # The successful results are disjoint, so the probability of any of them occurring is the sum of theirs
+    return math.fsum(
+        result["probability"] for result in successful_results(dice, target)
     )
-    # To get the total probability, we get the probability that none of the results will occur (1 - probability(x) for each result x, multiplied together)
-    probability_of_none_of_these_results = 1
-    for result in results:
-        result_of_this_result_not_occurring = 1 - result["probability"]
-        probability_of_none_of_these_results *= result_of_this_result_not_occurring
-    # Then we subtract that from 1 to get the probability that at least one of the results will occur
-    probability_of_at_least_one_result = 1 - probability_of_none_of_these_results
-    return probability_of_at_least_one_result
-    # endregion
 
 
 # Test the function when this file is executed as the main module
@@ -0,0 +1,88 @@
+import json
+import os
+import sqlite3
+import time
+
+# Bump this whenever a change to the engines would change their results, so that stale entries are discarded
+ENGINE_VERSION = 1
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".exploding_dice_cache.sqlite3"
+)
+DEFAULT_CACHE_SIZE = 10000
+
+
+class ResultCache:
+    """
+    A persistent cache of calculated odds and averages, stored in a local SQLite file.
+    Once it holds more than max_entries results, the least recently used ones are evicted.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_CACHE_SIZE):
+        self.path = path
+        self.max_entries = max_entries
+        # Autocommit, with a write-ahead log that is not synced on every commit (a lost entry is just recalculated)
+        self.connection = sqlite3.connect(path, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT, last_used INTEGER)"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)"
+        )
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT)"
+        )
+        # Results calculated by a different engine version are not trusted
+        row = self.connection.execute(
+            "SELECT value FROM metadata WHERE name = 'engine_version'"
+        ).fetchone()
+        if row is None or row[0] != str(ENGINE_VERSION):
+            self.clear()
+            self.connection.execute(
+                "INSERT OR REPLACE INTO metadata VALUES ('engine_version', ?)",
+                (str(ENGINE_VERSION),),
+            )
+
+    @staticmethod
+    def make_key(dice_string, target, method, precision):
+        """
+        Build the cache key of a result.
+        :param dice_string: The canonical dice string (see canonical_dice_string).
+        :param target: The target number, or None for averages.
+        :param method: How the result was calculated (e.g. "simulated" or "exact").
+        :param precision: The precision the result was calculated to (None if the method does not depend on one).
+        """
+        return json.dumps([dice_string, target, method, precision])
+
+    def get(self, key):
+        """Return the cached result for a key, or None if it is not cached."""
+        row = self.connection.execute(
+            "SELECT value FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        self.connection.execute(
+            "UPDATE results SET last_used = ? WHERE key = ?", (time.time_ns(), key)
+        )
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        """Store a JSON-serializable result, evicting the least recently used results if the cache is full."""
+        self.connection.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+            (key, json.dumps(value), time.time_ns()),
+        )
+        (count,) = self.connection.execute("SELECT COUNT(*) FROM results").fetchone()
+        if count > self.max_entries:
+            self.connection.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def clear(self):
+        """Remove every cached result."""
+        self.connection.execute("DELETE FROM results")
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,86 @@
+import gzip
+import json
+import sys
+
+# Number of roll records held in memory before they are written out together
+ROLL_LOG_CHUNK_SIZE = 10000
+
+
+def _open_log(path, mode):
+    # Logs ending in .gz are gzip-compressed
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class RollLogWriter:
+    """
+    Streams roll records to a newline-delimited JSON file, one [total, rolls] array per line.
+    Records are written out in chunks of chunk_size, so memory use does not grow with the number of rolls.
+    """
+
+    def __init__(self, path, chunk_size=ROLL_LOG_CHUNK_SIZE):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.file = _open_log(path, "w")
+        self.lines = []
+
+    def write(self, total, rolls):
+        """Add the total and rolls of one roll (as returned by roll_dice) to the log."""
+        self.lines.append(json.dumps([total, rolls], separators=(",", ":")))
+        if len(self.lines) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Write out the buffered records."""
+        if self.lines:
+            self.file.write("\n".join(self.lines) + "\n")
+            self.lines = []
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception_info):
+        self.close()
+
+
+def read_roll_log(path):
+    """
+    Replay a roll log written by RollLogWriter, one record at a time.
+    :param path: The log file (gzip-compressed if it ends in .gz).
+    :return: A generator of (total, rolls) tuples in the same form as roll_dice returns them.
+    """
+    with _open_log(path, "r") as file:
+        for line in file:
+            total, rolls = json.loads(line)
+            # JSON turns the (label, roll) tuples into lists, so they are turned back here
+            # An exploded die is a list of those pairs, and is recognizable by its first item being a list
+            yield total, [
+                (
+                    [tuple(unit) for unit in roll]
+                    if isinstance(roll[0], list)
+                    else tuple(roll)
+                )
+                for roll in rolls
+            ]
+
+
+# Summarize a roll log when this file is executed as the main module
+if __name__ == "__main__":
+    for path in sys.argv[1:]:
+        steps = 0
+        total = 0
+        explosions = 0
+        for roll_total, rolls in read_roll_log(path):
+            steps += 1
+            total += roll_total
+            explosions += sum(1 for roll in rolls if type(roll) == list)
+        print(f"{path}: {steps} rolls")
+        if steps > 0:
+            print(f"Average roll: {total / steps}")
+            print(f"Average number of explosions: {explosions / steps}")
+        print()
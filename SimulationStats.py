@@ -0,0 +1,91 @@
+import json
+import time
+from contextlib import contextmanager
+
+SIMULATION_PHASES = ("parse", "roll", "aggregate")
+
+
+class SimulationStats:
+    """
+    Counters and phase timings collected while simulating, to show where a workload spends its time.
+    Simulation functions only touch it when one is passed in, so profiling costs nothing when it is off.
+    Phase times are summed over every process that worked on the simulation.
+    """
+
+    def __init__(self):
+        self.trials = 0
+        self.dice_rolled = 0
+        # explosions_per_depth[d] is the number of dice that exploded at least d + 1 times in a row
+        self.explosions_per_depth = []
+        # The longest chain of rolls a single die made (1 if it never exploded)
+        self.max_chain_length = 0
+        self.phase_seconds = {phase: 0.0 for phase in SIMULATION_PHASES}
+
+    @contextmanager
+    def phase(self, name):
+        """Time the code run inside the with block as part of a phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_seconds[name] += time.perf_counter() - start
+
+    def record_rolls(self, count):
+        """Record that `count` dice were rolled (first rolls or re-rolls after explosions)."""
+        self.dice_rolled += count
+        if count > 0:
+            self.max_chain_length = max(self.max_chain_length, 1)
+
+    def record_explosions(self, depth, count):
+        """Record that `count` dice exploded for the (depth + 1)th time in a row."""
+        if count == 0:
+            return
+        while len(self.explosions_per_depth) <= depth:
+            self.explosions_per_depth.append(0)
+        self.explosions_per_depth[depth] += count
+        self.max_chain_length = max(self.max_chain_length, depth + 2)
+
+    def record_die(self, explosions):
+        """Record one die that was rolled and then exploded `explosions` times in a row."""
+        self.record_rolls(explosions + 1)
+        for depth in range(explosions):
+            self.record_explosions(depth, 1)
+
+    def merge(self, other):
+        """Add the counters and timings of another SimulationStats (e.g. from a worker) into this one."""
+        self.trials += other.trials
+        self.dice_rolled += other.dice_rolled
+        for depth, count in enumerate(other.explosions_per_depth):
+            self.record_explosions(depth, count)
+        self.max_chain_length = max(self.max_chain_length, other.max_chain_length)
+        for phase, seconds in other.phase_seconds.items():
+            self.phase_seconds[phase] += seconds
+        return self
+
+    def as_dict(self):
+        return {
+            "trials": self.trials,
+            "dice_rolled": self.dice_rolled,
+            "explosions_per_depth": self.explosions_per_depth,
+            "max_chain_length": self.max_chain_length,
+            "phase_seconds": self.phase_seconds,
+        }
+
+    def to_json(self):
+        """Write the stats as a machine-readable JSON report."""
+        return json.dumps(self.as_dict(), indent=4)
+
+    def report(self):
+        """Write the stats as a human-readable report."""
+        lines = [
+            f"Trials: {self.trials}",
+            f"Dice rolled: {self.dice_rolled}",
+            f"Longest explosion chain: {self.max_chain_length} rolls",
+        ]
+        for depth, count in enumerate(self.explosions_per_depth):
+            lines.append(f"Explosions at depth {depth + 1}: {count}")
+        total_seconds = sum(self.phase_seconds.values())
+        for phase, seconds in self.phase_seconds.items():
+            share = seconds / total_seconds * 100 if total_seconds > 0 else 0
+            lines.append(f"Time {phase}: {seconds:.4f}s ({share:.1f}%)")
+        return "\n".join(lines)